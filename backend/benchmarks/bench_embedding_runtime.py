@@ -0,0 +1,111 @@
+"""
+Compare embedding runtimes: PyTorch vs ONNX Runtime (float32 / int8).
+
+Encodes the same chunks with every runtime and reports throughput
+(chunks/s) plus parity against PyTorch: per-chunk cosine similarity
+(min / mean) and top-k neighbour agreement. Exits non-zero when a runtime
+falls below --min-cosine, so it doubles as the parity check:
+
+    cd backend
+    python benchmarks/bench_embedding_runtime.py --threads 4
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data')
+
+FALLBACK = [
+    'Excavations at Mohenjo-daro revealed a planned city with a grid of streets.',
+    'The Great Bath was built around 2500 BCE using fired brick and gypsum mortar.',
+    'Harappan seals often depict a unicorn-like animal above an undeciphered script.',
+    'Radiocarbon dates from Lothal place the dockyard in the mature Harappan phase.',
+    'Terracotta figurines and carnelian beads were traded as far as Mesopotamia.',
+]
+
+
+def load_texts(limit):
+    from chunker import chunk_text, make_chunker
+    from config import CHUNK_OVERLAP, CHUNK_SIZE, CHUNK_STRATEGY, CHUNK_TOKENS
+
+    texts = []
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, '**', '*.*'), recursive=True)):
+        if os.path.splitext(path)[1].lower() not in ('.txt', '.md', '.json'):
+            continue
+        with open(path, encoding='utf-8', errors='replace') as f:
+            chunker = make_chunker(CHUNK_STRATEGY, CHUNK_SIZE, CHUNK_TOKENS, CHUNK_OVERLAP)
+            texts.extend(c for _, c in chunk_text(f.read(), chunker) if c.strip())
+    texts = texts or FALLBACK
+    # Repeat the corpus up to the requested size so throughput is measurable
+    return (texts * (limit // len(texts) + 1))[:limit]
+
+
+def run(runtime, texts, batch_size, threads):
+    from embeddings import EmbeddingManager
+
+    name, _, variant = runtime.partition(':')
+    manager = EmbeddingManager(runtime=name, quantize=variant == 'int8', threads=threads)
+    manager.embed_text(texts[:batch_size], batch_size)  # warm up kernels and allocations
+    start = time.perf_counter()
+    vectors = manager.embed_text(texts, batch_size)
+    return vectors, time.perf_counter() - start
+
+
+def neighbour_agreement(reference, vectors, k):
+    ref = np.argsort(-(reference @ reference.T), axis=1)[:, 1:k + 1]
+    got = np.argsort(-(vectors @ vectors.T), axis=1)[:, 1:k + 1]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ref, got)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runtimes', nargs='+', default=['torch', 'onnx', 'onnx:int8'],
+                        help='torch | onnx | onnx:int8; the first one is the parity reference')
+    parser.add_argument('--chunks', type=int, default=512)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=0, help='Intra-op threads (0 = runtime default)')
+    parser.add_argument('--onnx-dir', default=None, help='Override ONNX_MODEL_DIR')
+    parser.add_argument('--min-cosine', type=float, default=0.98, help='Fail below this per-chunk cosine')
+    parser.add_argument('-k', type=int, default=5, help='Neighbours compared for agreement')
+    args = parser.parse_args()
+
+    if args.onnx_dir:
+        os.environ['ONNX_MODEL_DIR'] = args.onnx_dir
+
+    texts = load_texts(args.chunks)
+    unique = len(set(texts))
+    print(f'{len(texts)} chunks ({unique} unique), batch size {args.batch_size}, threads {args.threads or "auto"}')
+    print(f"{'runtime':<10} {'seconds':>8} {'chunks/s':>9} {'cos_min':>8} {'cos_mean':>9} {'top_k':>6}")
+
+    reference = None
+    failed = False
+    for runtime in args.runtimes:
+        try:
+            vectors, seconds = run(runtime, texts, args.batch_size, args.threads)
+        except ImportError as e:
+            print(f'{runtime:<10} skipped ({e})')
+            continue
+        if reference is None:
+            reference = vectors
+        cosines = np.sum(reference * vectors, axis=1) / (
+            np.linalg.norm(reference, axis=1) * np.linalg.norm(vectors, axis=1)
+        )
+        agreement = neighbour_agreement(reference[:unique], vectors[:unique], min(args.k, unique - 1)) if unique > 1 else 1.0
+        print(f'{runtime:<10} {seconds:>8.2f} {len(texts) / seconds:>9.1f} '
+              f'{cosines.min():>8.4f} {cosines.mean():>9.4f} {agreement:>6.2f}')
+        failed |= bool(cosines.min() < args.min_cosine)
+
+    if failed:
+        print(f'❌ Parity below {args.min_cosine} cosine')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
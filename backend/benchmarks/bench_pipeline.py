@@ -0,0 +1,339 @@
+"""
+End-to-end pipeline benchmark against a local LLM stand-in.
+
+Starts fake_llm_server.py in-process with a configurable latency, points
+the FastAPI app from main.py at it (isolated temp index, caches off), then:
+
+1. uploads every file in data/ through /api/upload
+2. grows a synthetic corpus through each --sizes step (e.g. 1k -> 100k
+   chunks), timing chunk / embed / store write per step
+3. at each size, fires --queries requests at /api/query with
+   --concurrency in flight and reports p50 / p95 / p99 and throughput,
+   plus a sequential per-stage breakdown (embed, retrieve, prompt build,
+   LLM time-to-first-token and total)
+
+Results are written as JSON (commit, config and numbers) so runs can be
+compared across commits:
+
+    cd backend
+    python benchmarks/bench_pipeline.py --sizes 1000 10000 --queries 200
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/<old>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BACKEND_DIR, '..', 'data')
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+sys.path.insert(0, BACKEND_DIR)
+
+SITES = ['Mohenjo-daro', 'Harappa', 'Lothal', 'Dholavira', 'Kalibangan', 'Rakhigarhi', 'Chanhudaro', 'Banawali']
+FINDS = ['steatite seals', 'carnelian beads', 'terracotta figurines', 'copper tools', 'painted pottery',
+         'weights of chert', 'bronze statuettes', 'shell bangles']
+FEATURES = ['a drainage system', 'a granary', 'a citadel mound', 'a dockyard', 'fire altars', 'a great bath',
+            'fortification walls', 'a lower town']
+QUESTIONS = [
+    'What was found at {site}?',
+    'When was {site} occupied?',
+    'Which site had {feature}?',
+    'Where were {find} excavated?',
+    'How old are the {find} from {site}?',
+]
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 2) if values else None
+
+
+def summarize(values):
+    return {'mean': round(float(np.mean(values)), 2) if values else None,
+            'p50': percentile(values, 50), 'p95': percentile(values, 95)}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def synthetic_document(rng, sentences=60):
+    lines = []
+    for _ in range(sentences):
+        start = rng.randint(2000, 3300)
+        lines.append(
+            f'Excavations at {rng.choice(SITES)} uncovered {rng.choice(FINDS)} near {rng.choice(FEATURES)}, '
+            f'dated c. {start} BCE to {start - rng.randint(50, 400)} BCE in trench {rng.randint(1, 40)}.'
+        )
+    return ' '.join(lines)
+
+
+def questions(rng, n):
+    return [rng.choice(QUESTIONS).format(site=rng.choice(SITES), find=rng.choice(FINDS), feature=rng.choice(FEATURES))
+            for _ in range(n)]
+
+
+def start_fake_llm(first_token_ms, token_ms, tokens):
+    import uvicorn
+    from fake_llm_server import create_app
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(first_token_ms, token_ms, tokens), host='127.0.0.1', port=port, log_level='warning'
+    ))
+    threading.Thread(target=server.run, name='fake-llm', daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f'http://127.0.0.1:{port}/v1'
+
+
+async def ingest_data_dir(client):
+    rows = []
+    for name in sorted(os.listdir(DATA_DIR)):
+        path = os.path.join(DATA_DIR, name)
+        if not os.path.isfile(path) or os.path.splitext(name)[1].lower() not in ('.txt', '.md', '.json'):
+            continue
+        with open(path, 'rb') as f:
+            body = f.read()
+        start = time.perf_counter()
+        response = await client.post('/api/upload', files={'file': (name, body, 'text/plain')})
+        seconds = time.perf_counter() - start
+        ok = response.status_code == 200
+        rows.append({'file': name, 'bytes': len(body), 'seconds': round(seconds, 3),
+                     'chunks': response.json().get('chunks') if ok else None, 'status': response.status_code})
+        print(f'  {name:<36} {len(body) / 1024:>8.1f} KiB {seconds:>7.3f}s {rows[-1]["chunks"]} chunks')
+    return rows
+
+
+def grow_corpus(app, target, current, rng, fake_embeddings, dim):
+    """Ingest synthetic documents until the store holds target chunks"""
+    from chunker import chunk_text
+    from config import CHUNK_STRATEGY
+
+    stages = {'chunk': 0.0, 'embed': 0.0, 'store_write': 0.0, 'persist': 0.0}
+    added = 0
+    doc = 0
+    while current + added < target:
+        t = time.perf_counter()
+        chunks = [c for _, c in chunk_text(synthetic_document(rng), app.get_chunker(CHUNK_STRATEGY))]
+        chunks = chunks[:target - current - added]
+        stages['chunk'] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        if fake_embeddings:
+            vectors = np.random.default_rng(rng.randint(0, 1 << 30)).standard_normal((len(chunks), dim)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        else:
+            vectors = app.get_embedder().embed_batches(chunks)
+        stages['embed'] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        app.index_chunks(chunks, vectors, f'synthetic_{current + added}_{doc}.txt')
+        stages['store_write'] += time.perf_counter() - t
+        added += len(chunks)
+        doc += 1
+
+    t = time.perf_counter()
+    app.persist_indexes()
+    stages['persist'] += time.perf_counter() - t
+    total = sum(stages.values())
+    return {
+        'chunks_added': added,
+        'seconds': round(total, 3),
+        'chunks_per_s': round(added / total, 1) if total else None,
+        'stages_s': {k: round(v, 3) for k, v in stages.items()},
+    }
+
+
+async def load_test(client, qs, concurrency, mode):
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(q):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post('/api/query', data={'q': q, 'mode': mode})
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in qs))
+    wall = time.perf_counter() - start
+    return {
+        'queries': len(qs),
+        'concurrency': concurrency,
+        'errors': errors,
+        'qps': round(len(qs) / wall, 2),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+    }
+
+
+async def stage_breakdown(app, qs, mode):
+    """Run queries one at a time through each stage to attribute latency"""
+    stages = {'embed': [], 'retrieve': [], 'prompt_build': [], 'llm_ttft': [], 'llm_total': []}
+    for q in qs:
+        t = time.perf_counter()
+        q_emb = await asyncio.to_thread(lambda: app.get_embedder().embed_text(q)[0])
+        stages['embed'].append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        chunks, ids, metadatas = await asyncio.to_thread(app.retrieve, q, mode, 3, q_emb)
+        stages['retrieve'].append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        messages, _ = app.build_messages(q, chunks, ids, metadatas)
+        stages['prompt_build'].append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        first = None
+        async for _ in app.get_llm().stream(messages, app.QUERY_MODEL):
+            if first is None:
+                first = time.perf_counter()
+        stages['llm_ttft'].append(((first or time.perf_counter()) - t) * 1000)
+        stages['llm_total'].append((time.perf_counter() - t) * 1000)
+    return {name: summarize(values) for name, values in stages.items()}
+
+
+async def run(args, workdir):
+    import httpx
+
+    server, base_url = start_fake_llm(args.first_token_ms, args.token_ms, args.tokens)
+    os.environ.update({
+        'LLM_BASE_URL': base_url,
+        'VECTOR_BACKEND': args.backend,
+        'NUMPY_PRECISION': args.precision,
+        'NUMPY_INDEX_PATH': os.path.join(workdir, 'numpy_index'),
+        'CHROMA_PATH': os.path.join(workdir, 'chroma'),
+        'BM25_PATH': os.path.join(workdir, 'bm25.json'),
+        'SNAPSHOT_PATH': os.path.join(workdir, 'snapshot'),
+        'DEDUP_PATH': os.path.join(workdir, 'dedup_index.npz'),
+        'DATE_INDEX_PATH': os.path.join(workdir, 'date_index.json'),
+        'DOCUMENT_REGISTRY_PATH': os.path.join(workdir, 'documents.json'),
+        'INDEX_GENERATION_PATH': os.path.join(workdir, 'index.generation'),
+        'EMBED_CACHE_PATH': os.path.join(workdir, 'embeddings.sqlite3'),
+        'WARMUP_ON_STARTUP': 'false',
+    })
+    if not args.with_caches:
+        os.environ.update({'EMBED_CACHE_ENABLED': 'false', 'QUERY_EMBED_CACHE_SIZE': '0', 'ANSWER_CACHE_SIZE': '0'})
+    import main as app
+
+    rng = random.Random(args.seed)
+    results = {'data_ingest': [], 'scales': []}
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=120) as client:
+        t = time.perf_counter()
+        app.get_embedder()
+        results['model_load_s'] = round(time.perf_counter() - t, 3)
+
+        if not args.skip_data:
+            print(f'📂 Uploading {DATA_DIR}')
+            results['data_ingest'] = await ingest_data_dir(client)
+
+        for size in sorted(args.sizes):
+            current = app.get_db().count()
+            if size > current:
+                print(f'🧱 Growing corpus {current} -> {size} chunks')
+                ingest = await asyncio.to_thread(
+                    grow_corpus, app, size, current, rng, args.fake_embeddings, app.get_embedder().embedding_dim
+                )
+            else:
+                ingest = None
+            qs = questions(rng, args.queries)
+            load = await load_test(client, qs, args.concurrency, args.mode)
+            stages = await stage_breakdown(app, qs[:args.stage_samples], args.mode)
+            results['scales'].append({'chunks': app.get_db().count(), 'ingest': ingest, 'query': load, 'stages_ms': stages})
+            print(f"  {app.get_db().count():>7} chunks  ingest {ingest['chunks_per_s'] if ingest else '-'} chunks/s  "
+                  f"query p50 {load['p50_ms']} p95 {load['p95_ms']} p99 {load['p99_ms']} ms  {load['qps']} q/s")
+
+    await app.get_llm().aclose()
+    await app.question_batcher.aclose()
+    server.should_exit = True
+    return results
+
+
+def compare(current, baseline):
+    print(f"\nvs {baseline['meta']['commit']} ({baseline['meta']['timestamp']})")
+    print(f"{'chunks':>8} {'metric':<14} {'baseline':>10} {'current':>10} {'change':>8}")
+    old = {s['chunks']: s for s in baseline['scales']}
+    for scale in current['scales']:
+        before = old.get(scale['chunks'])
+        if not before:
+            continue
+        pairs = [(f'query {k}', before['query'][k], scale['query'][k]) for k in ('p50_ms', 'p95_ms', 'p99_ms', 'qps')]
+        if scale['ingest'] and before['ingest']:
+            pairs.append(('ingest chunks/s', before['ingest']['chunks_per_s'], scale['ingest']['chunks_per_s']))
+        for name, a, b in pairs:
+            change = f'{(b - a) / a * 100:+.1f}%' if a and b is not None else '-'
+            print(f"{scale['chunks']:>8} {name:<14} {a:>10} {b:>10} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Corpus sizes in chunks')
+    parser.add_argument('--queries', type=int, default=200, help='Queries per corpus size')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--stage-samples', type=int, default=20, help='Sequential queries for the stage breakdown')
+    parser.add_argument('--mode', default='dense', help='dense | hybrid')
+    parser.add_argument('--backend', default='numpy', help='chroma | numpy')
+    parser.add_argument('--precision', default='float32', help='numpy precision: float32 | float16 | int8')
+    parser.add_argument('--first-token-ms', type=float, default=200.0, help='Fake LLM time to first token')
+    parser.add_argument('--token-ms', type=float, default=20.0, help='Fake LLM delay per token')
+    parser.add_argument('--tokens', type=int, default=40, help='Fake LLM answer length')
+    parser.add_argument('--fake-embeddings', action='store_true',
+                        help='Random vectors for the synthetic corpus (measures the store, not the model)')
+    parser.add_argument('--with-caches', action='store_true', help='Keep embedding / query / answer caches on')
+    parser.add_argument('--skip-data', action='store_true', help='Do not upload data/')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='Results JSON (default benchmarks/results/<commit>_<time>.json)')
+    parser.add_argument('--compare', default=None, help='Earlier results JSON to diff against')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    try:
+        results = asyncio.run(run(args, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git_commit()
+    results['meta'] = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'args': vars(args),
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f'💾 Results saved to {output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare vector store backends on synthetic MiniLM-sized embeddings.
+
+Reports build time, per-query latency (p50 / p95) and recall@k against
+exact brute force for each backend and corpus size:
+
+    cd backend
+    python benchmarks/bench_vector_store.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_store import create_store  # noqa: E402
+
+
+def synthetic(n, dim, rng):
+    # Clustered vectors so nearest neighbours are meaningful, like real chunks
+    centers = rng.standard_normal((max(n // 50, 1), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def perturbed(vectors, n, rng):
+    picks = vectors[rng.integers(0, len(vectors), n)]
+    queries = picks + 0.2 * rng.standard_normal(picks.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors, queries, k):
+    scores = queries @ vectors.T
+    return [set(np.argsort(-row)[:k]) for row in scores]
+
+
+def bench(backend, vectors, queries, k, truth, workdir):
+    ids = [str(i) for i in range(len(vectors))]
+    docs = [''] * len(vectors)
+    name, _, precision = backend.partition(':')
+    store = create_store(
+        name, chroma_path=os.path.join(workdir, name), collection_name='bench',
+        numpy_path=None, dim=vectors.shape[1], precision=precision or 'float32'
+    )
+
+    start = time.perf_counter()
+    for s in range(0, len(ids), 5000):
+        store.add(ids[s:s + 5000], vectors[s:s + 5000], docs[s:s + 5000])
+    build = time.perf_counter() - start
+
+    latencies, hits = [], 0
+    for q, expected in zip(queries, truth):
+        t = time.perf_counter()
+        result = store.query(q, n_results=k)
+        latencies.append((time.perf_counter() - t) * 1000)
+        hits += len(expected & {int(i) for i in result['ids'][0]})
+    return {
+        'backend': backend,
+        'n': len(vectors),
+        'build_s': round(build, 3),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'recall': round(hits / (k * len(queries)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--backends', nargs='+', default=['numpy', 'numpy:float16', 'numpy:int8', 'chroma'],
+                        help='backend[:precision], precision applies to numpy')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('-k', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    workdir = tempfile.mkdtemp(prefix='bench_vs_')
+    try:
+        print(f"{'backend':<14} {'n':>7} {'build_s':>8} {'p50_ms':>8} {'p95_ms':>8} {'recall':>7}")
+        for n in args.sizes:
+            vectors = synthetic(n, args.dim, rng)
+            queries = perturbed(vectors, args.queries, rng)
+            truth = exact_top_k(vectors, queries, args.k)
+            for backend in args.backends:
+                try:
+                    r = bench(backend, vectors, queries, args.k, truth, os.path.join(workdir, str(n)))
+                except ImportError as e:
+                    print(f'{backend:<14} skipped ({e})')
+                    continue
+                print(f"{r['backend']:<14} {r['n']:>7} {r['build_s']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['recall']:>7}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
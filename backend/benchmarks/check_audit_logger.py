@@ -0,0 +1,99 @@
+"""
+Exercise the batched audit logger against in-memory stand-ins.
+
+Checks batching per table, retry with backoff, spill on overflow and on
+persistent failure, replay of per-process spill files, flush on close, rows of
+an insert cut off by the close timeout, and the cost of a log call on the
+request path. Exits non-zero on failure:
+
+    cd backend
+    python benchmarks/check_audit_logger.py
+"""
+
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supabase_client import MemorySink, SupabaseClient  # noqa: E402
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+async def main():
+    spill = os.path.join(tempfile.mkdtemp(prefix='audit_check_'), 'spill.jsonl')
+
+    # Batching: 250 rows over two tables, one insert per table per drained batch
+    sink = MemorySink()
+    audit = SupabaseClient(sink, batch_size=100, flush_interval=0.05, backoff=0.01)
+    await audit.start()
+    start = time.perf_counter()
+    for i in range(250):
+        audit.log_query(f'q{i}', 'answer', 3) if i % 2 else audit.log_document_upload(str(i), f'{i}.txt', 0.1)
+    per_call_us = (time.perf_counter() - start) / 250 * 1e6
+    await audit.close()
+    check(len(sink.tables['queries']) == 125 and len(sink.tables['documents']) == 125, 'all rows written on close')
+    check(sink.calls <= 6, f'batched into {sink.calls} inserts')
+    check(per_call_us < 200, f'log() costs {per_call_us:.1f} us on the request path')
+
+    # Transient failures are retried
+    sink = MemorySink(fail_times=2)
+    audit = SupabaseClient(sink, flush_interval=0.01, backoff=0.01)
+    await audit.start()
+    audit.log_timeline('harappa', [{'year': -2600}])
+    await asyncio.sleep(0.2)
+    await audit.close()
+    check(sink.tables.get('timelines') and audit.counts['retried'] == 2, 'retried twice, then written')
+
+    # Persistent failure and a full queue spill to disk...
+    sink = MemorySink(fail_times=10 ** 6)
+    audit = SupabaseClient(sink, max_queue=5, max_retries=1, flush_interval=10, backoff=0.01, spill_path=spill)
+    await audit.start()
+    accepted = [audit.log_query(f'q{i}', 'a', 1) for i in range(8)]
+    check(accepted.count(False) == 3, 'overflow beyond max_queue is rejected')
+    await audit.close()
+    own = audit._spill_file(os.getpid())
+    check(audit.counts['spilled'] == 8 and os.path.exists(own), 'failed and overflow rows spilled')
+
+    # ...and are replayed on the next start, with files of exited workers but
+    # not those of workers still running
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    shutil.copy(own, audit._spill_file(exited.pid))
+    running = audit._spill_file(os.getppid())
+    shutil.copy(own, running)
+    sink = MemorySink()
+    audit = SupabaseClient(sink, flush_interval=0.01, spill_path=spill)
+    await audit.start()
+    await audit.close()
+    check(len(sink.tables.get('queries', [])) == 16 and not os.path.exists(own), 'spill files replayed')
+    check(os.path.exists(running), 'spill file of a running worker left alone')
+
+    # An insert still running when close() times out is spilled, not lost
+    os.remove(running)
+    release = threading.Event()
+    sink = MemorySink()
+    sink.insert = lambda table, rows: release.wait(5)
+    audit = SupabaseClient(sink, flush_interval=10, spill_path=spill)
+    await audit.start()
+    for i in range(5):
+        audit.log_query(f'q{i}', 'a', 1)
+    audit._wake.set()
+    await asyncio.sleep(0.05)  # the drain task is now inside the insert
+    await audit.close(timeout=0.05)
+    release.set()
+    check(audit.counts['spilled'] == 5 and audit.counts['written'] == 0, 'in-flight batch spilled on close timeout')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+Exercise date extraction and the date index's persisted removals.
+
+Checks years written with thousands separators ("2,600 BCE"), then removes
+chunks both one event at a time and through the bulk path (at least
+DateIndex._MERGE_AT events), saves the removals as log records, and checks
+that a reload and a second process's refresh agree with the writer. Exits
+non-zero on failure:
+
+    cd backend
+    python benchmarks/check_date_index.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timeline_generator import DateIndex, extract_dates  # noqa: E402
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def chunk(n: int, years: int) -> str:
+    return ' '.join(f'Layer {n}.{i} of the mound dates to {2000 + n * 10 + i} BCE.' for i in range(years))
+
+
+def spans(text: str):
+    return [(d.start, d.end) for d in extract_dates(text)]
+
+
+def main():
+    # Thousands separators: the whole number is the year, not the digits after the comma
+    check(spans('around 2,600 BCE') == [(-2600, -2600)], '"around 2,600 BCE" is 2600 BCE')
+    check(spans('between 2,600 and 1,900 BCE') == [(-2600, -1900)], '"between 2,600 and 1,900 BCE" is one range')
+    check(spans('c. 12,000-10,500 BC') == [(-12000, -10500)], 'five-digit years with separators in a range')
+    check(spans('AD 1,200') == [(1200, 1200)], 'AD prefix with a separator')
+    check(spans('dug in 1946, 2600 BCE levels') == [(-2600, -2600)], 'a comma between two numbers is not a separator')
+
+    path = os.path.join(tempfile.mkdtemp(prefix='date_index_check_'), 'date_index.json')
+    ids = [f'doc.txt_{n}' for n in range(20)]
+    writer = DateIndex(path)
+    writer.add(ids, [chunk(n, 10) for n in range(20)])
+    writer.save()
+    reader = DateIndex(path)
+    check(len(writer) == len(reader) == 200, 'events saved and loaded')
+
+    # 100 events in one remove() take the bulk path; 10 take the per-event path
+    bulk, single = ids[:10], ids[10:11]
+    check(10 * 10 >= DateIndex._MERGE_AT > 10, 'removals cover both paths')
+    writer.remove(bulk)
+    writer.remove(single)
+    writer.save()
+    check(len(writer) == 90, 'removed in memory')
+    check(len(DateIndex(path)) == 90, 'removals survive a reload')
+    check(reader.refresh() and len(reader) == 90, 'removals reach another process through the log')
+    check(not reader.range(2000, 2109), 'no removed event is left in range()')
+
+    # The same removals after a compaction, from the rewritten file
+    writer.save(compact=True)
+    check(len(DateIndex(path)) == 90, 'removals kept by compaction')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Check that near-duplicate chunks survive the removal of the chunk they duplicated.
+
+Documents B, C and D repeat a paragraph of document A (lightly edited);
+ingest skips their copies in favour of A's chunk. Deleting A must leave the
+paragraph findable under B, with the other copies re-pointed to B's chunk;
+replacing B with a version without the paragraph hands it on to C, and
+deleting C to D. Uses a throwaway index directory.
+Exits non-zero on failure:
+
+    cd backend
+    python benchmarks/check_duplicate_promotion.py
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+SHARED = (
+    'The northern granary at Harappa stood on a brick platform with air ducts beneath its floor, '
+    'and rows of circular working floors nearby held husks of wheat and barley. Excavators in 1946 '
+    'traced its walls across twelve bays and argued that it stored the surplus of the surrounding '
+    'villages before it was carted down the river to the citadel mound around 2450 BCE.'
+)
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def document(intro: str, shared: str) -> str:
+    # Paragraphs long enough that the chunker keeps the shared one on its own
+    site = intro.split()[0]
+    opening = ' '.join(f'{intro} Trench {i} of {site} was recorded in the day book.' for i in range(8))
+    closing = ' '.join(f'Finds list {i} for {site} follows the trench numbering.' for i in range(10))
+    return f'{opening}\n\n{shared}\n\n{closing}'
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='dedup_check_')
+    os.environ.update({
+        'VECTOR_BACKEND': 'numpy',
+        'NUMPY_INDEX_PATH': os.path.join(workdir, 'numpy_index'),
+        'BM25_PATH': os.path.join(workdir, 'bm25.json'),
+        'DEDUP_PATH': os.path.join(workdir, 'dedup_index.npz'),
+        'DEDUP_MODE': 'link',
+        'DATE_INDEX_PATH': os.path.join(workdir, 'date_index.json'),
+        'DOCUMENT_REGISTRY_PATH': os.path.join(workdir, 'documents.json'),
+        'INDEX_GENERATION_PATH': os.path.join(workdir, 'index.generation'),
+        'SNAPSHOT_PATH': os.path.join(workdir, 'snapshot'),
+        'EMBED_CACHE_ENABLED': 'false',
+        'WARMUP_ON_STARTUP': 'false',
+    })
+    os.chdir(BACKEND)
+    import main as app
+
+    app.ingest(document('Mohenjo-daro survey of the great bath and its drains.', SHARED), 'A.txt', 'paragraph')
+    b = app.ingest(document('Lothal dockyard report on the tidal basin.', SHARED.replace('1946', '1946-47')), 'B.txt', 'paragraph')
+    c = app.ingest(document('Kalibangan ploughed field beneath the rampart.', SHARED.replace('twelve', '12')), 'C.txt', 'paragraph')
+    d = app.ingest(document('Dholavira reservoirs in the bedrock.', SHARED.replace('circular', 'round')), 'D.txt', 'paragraph')
+    check(b['duplicates'] == c['duplicates'] == d['duplicates'] == 1, 'the copies of the paragraph were skipped')
+
+    def holders():
+        hits = [chunk_id for chunk_id, _ in app.get_lexical().search('granary air ducts husks barley', 10)]
+        return {chunk_id.rsplit('_', 1)[0] for chunk_id in hits}
+
+    check(holders() == {'A.txt'}, "only A's chunk holds the paragraph")
+
+    app.delete_document('A.txt')
+    check(holders() == {'B.txt'}, 'after deleting A the paragraph is found under B')
+    heir = app.get_lexical().search('granary air ducts husks barley', 1)[0][0]
+    stored = app.get_db().get([heir])
+    check(stored['metadatas'][0]['source'] == 'B.txt', "it is stored as B's chunk")
+    found = app.get_db().query(app.get_embedder().embed_text(stored['documents'][0]), 1, {'source': 'B.txt'})
+    check(found['ids'][0] == [heir], 'dense search filtered to B finds it too')
+    check(app.get_dates().range(-2450, -2450), 'its date is indexed again')
+    unstored = {d['source']: d['chunks'] - d['stored'] for d in app.get_registry().documents()}
+    check(unstored == {'B.txt': 0, 'C.txt': 1, 'D.txt': 1}, 'B registers the chunk as stored, C and D still as duplicates')
+
+    app.ingest(document('Lothal dockyard report on the tidal basin.', 'The basin was lined with baked brick.'), 'B.txt', 'paragraph')
+    check(holders() == {'C.txt'}, "after replacing B without the paragraph it passes on to C's copy")
+
+    app.delete_document('C.txt')
+    check(holders() == {'D.txt'}, "after deleting C it passes on to D's copy")
+
+    app.persist_indexes()
+    app.reload_indexes()
+    unstored = {d['source']: d['chunks'] - d['stored'] for d in app.get_registry().documents()}
+    check(holders() == {'D.txt'} and unstored == {'B.txt': 0, 'D.txt': 0}, 'the hand-over survives a reload')
+
+
+if __name__ == '__main__':
+    main()
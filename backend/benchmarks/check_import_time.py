@@ -0,0 +1,65 @@
+"""
+Import-time regression check for the API module.
+
+Imports main.py in a fresh interpreter, fails if it takes longer than the
+budget or if a heavy library (torch, sentence_transformers, chromadb, groq)
+was pulled in eagerly:
+
+    cd backend
+    python benchmarks/check_import_time.py --budget 1.5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('torch', 'sentence_transformers', 'chromadb', 'groq', 'transformers')
+
+PROBE = f"""
+import sys, time
+t = time.perf_counter()
+import main
+elapsed = time.perf_counter() - t
+loaded = [m for m in {HEAVY!r} if m in sys.modules]
+print(f'{{elapsed:.3f}} {{",".join(loaded)}}')
+"""
+
+
+def measure(runs: int):
+    env = {**os.environ, 'WARMUP_ON_STARTUP': 'false'}
+    timings, heavy = [], set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, '-c', PROBE], cwd=BACKEND, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        elapsed, _, loaded = out.partition(' ')
+        timings.append(float(elapsed))
+        heavy.update(filter(None, loaded.split(',')))
+    return min(timings), sorted(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget', type=float, default=1.5, help='Max seconds for `import main`')
+    parser.add_argument('--runs', type=int, default=3, help='Best of N fresh interpreters')
+    args = parser.parse_args()
+
+    elapsed, heavy = measure(args.runs)
+    print(f'import main: {elapsed:.3f}s (budget {args.budget:.3f}s)')
+    failures = []
+    if heavy:
+        failures.append(f'heavy modules imported eagerly: {", ".join(heavy)}')
+    if elapsed > args.budget:
+        failures.append(f'import took {elapsed:.3f}s, over the {args.budget:.3f}s budget')
+    for failure in failures:
+        print(f'❌ {failure}')
+    if not failures:
+        print('✅ Import time OK')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+Incremental BM25 inverted index for lexical retrieval.
+
+Dense MiniLM embeddings blur exact tokens that archaeology questions
+depend on (site names like Mohenjo-daro, ids like exc_001, dates like
+2600 BCE). This index is updated at ingest time next to the vector store
+and fused with dense results via reciprocal rank fusion.
+"""
+
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from delta_log import DeltaLog, file_bytes, latest
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+(?:[-_][a-z0-9]+)*')
+_ERA_RE = re.compile(r'\b(\d{1,5})\s*(bce|bc|ce|ad)\b')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased tokens that keep compound identifiers intact.
+
+    "Mohenjo-daro" yields mohenjo-daro, mohenjo and daro; "exc_001" stays
+    whole (plus its parts); "2600 BCE" also yields the joined token 2600bce.
+    """
+    text = text.lower()
+    tokens = []
+    for match in _TOKEN_RE.finditer(text):
+        token = match.group()
+        tokens.append(token)
+        if '-' in token or '_' in token:
+            tokens.extend(p for p in re.split(r'[-_]', token) if p)
+    tokens.extend(number + era for number, era in _ERA_RE.findall(text))
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk ids, supporting incremental add and remove.
+
+    save() appends the term counts of changed chunks to a log next to the
+    JSON file (see delta_log.py) and rewrites the file itself only once the
+    log has grown past compact_ratio of it.
+    """
+
+    def __init__(self, path: str = None, k1: float = 1.5, b: float = 0.75, compact_ratio: float = 0.5):
+        """
+        Args:
+            path: JSON file to load from and save() to
+            k1: Term-frequency saturation
+            b: Length normalization strength
+            compact_ratio: Log size, relative to the JSON file, that triggers a rewrite
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._terms: Dict[str, List[str]] = {}  # chunk id -> its terms, so removal only touches its postings
+        self._doc_len: Dict[str, int] = {}
+        self._total_len = 0
+        self._changed = set()  # chunk ids to log on the next save()
+        self._log = DeltaLog(f'{path}.log', compact_ratio) if path else None
+        if path and os.path.exists(path):
+            self._load(path)
+        if self._log:
+            self._apply(latest(self._log.read(initial=True)))
+            self._changed.clear()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Index chunks; an existing id is re-indexed with its new text"""
+        with self._lock:
+            self.remove([i for i in ids if i in self._doc_len])
+            for chunk_id, text in zip(ids, texts):
+                counts = Counter(tokenize(text))
+                for term, tf in counts.items():
+                    self._postings[term][chunk_id] = tf
+                self._terms[chunk_id] = list(counts)
+                length = sum(counts.values())
+                self._doc_len[chunk_id] = length
+                self._total_len += length
+            self._changed.update(ids)
+
+    def remove(self, ids: Iterable[str]) -> None:
+        """Drop chunks from the index (unknown ids are ignored)"""
+        ids = set(ids)
+        if not ids:
+            return
+        with self._lock:
+            for chunk_id in ids:
+                self._total_len -= self._doc_len.pop(chunk_id, 0)
+                for term in self._terms.pop(chunk_id, ()):
+                    postings = self._postings[term]
+                    del postings[chunk_id]
+                    if not postings:
+                        del self._postings[term]
+            self._changed.update(ids)
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[str, float]]:
+        """
+        Rank chunks for a query.
+
+        Returns:
+            Up to k (chunk id, score) pairs, best first
+        """
+        with self._lock:
+            n = len(self._doc_len)
+            if not n:
+                return []
+            avg_len = self._total_len / n
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for chunk_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[chunk_id] / avg_len)
+                    scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self, path: str = None, compact: Optional[bool] = None) -> None:
+        """
+        Persist changes since the last save.
+
+        Args:
+            path: Write a full copy here instead (e.g. for a backup)
+            compact: Force (True) or suppress (False) rewriting the JSON file;
+                None rewrites once the log is large
+        """
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            if path != self.path:
+                self._write(path)
+                return
+            if not self._changed and not compact and self._log.exists():
+                return
+            records = []
+            for chunk_id in self._changed:
+                terms = self._terms.get(chunk_id)
+                value = {term: self._postings[term][chunk_id] for term in terms} if terms is not None else None
+                records.append({'key': chunk_id, 'value': value})
+            self._log.save(records, lambda: self._write(path), file_bytes(path), compact)
+            self._changed.clear()
+
+    def refresh(self) -> bool:
+        """
+        Apply changes other processes saved since this index was loaded.
+
+        Returns:
+            False when the index has to be reloaded instead (file rewritten)
+        """
+        if not self._log:
+            return True
+        with self._lock:
+            records = self._log.read()
+            if records is None:
+                return False
+            pending, self._changed = self._changed, set()
+            self._apply(latest(records))
+            self._changed = pending
+            return True
+
+    def _apply(self, changes: Dict[str, Optional[Dict[str, int]]]) -> None:
+        self.remove([chunk_id for chunk_id in changes if chunk_id in self._doc_len])
+        for chunk_id, counts in changes.items():
+            if counts is None:
+                continue
+            for term, tf in counts.items():
+                self._postings[term][chunk_id] = tf
+            self._terms[chunk_id] = list(counts)
+            length = sum(counts.values())
+            self._doc_len[chunk_id] = length
+            self._total_len += length
+
+    def _write(self, path: str) -> None:
+        """Write the whole index as JSON (atomic replace)"""
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'postings': self._postings, 'doc_len': self._doc_len}, f)
+        os.replace(tmp, path)
+
+    def _load(self, path: str) -> None:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        self._postings = defaultdict(dict, data['postings'])
+        self._doc_len = data['doc_len']
+        self._terms = defaultdict(list)
+        for term, postings in self._postings.items():
+            for chunk_id in postings:
+                self._terms[chunk_id].append(term)
+        self._terms = dict(self._terms)
+        self._total_len = sum(self._doc_len.values())
+        logger.info(f"Loaded BM25 index with {len(self._doc_len)} chunks")
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[str]:
+    """
+    Fuse several ranked id lists: score(id) = sum 1 / (k + rank).
+
+    Args:
+        rankings: Ranked chunk id lists (best first), e.g. dense and BM25
+        k: Damping constant; 60 is the value from the original RRF paper
+
+    Returns:
+        All ids, best fused score first
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,286 @@
+"""
+Bulk corpus importer.
+
+Walks a directory, parses TXT/Markdown files and JSON record files, then
+chunks and embeds them across a process pool and writes straight into the
+configured vector store and BM25 index (no HTTP round-trips):
+
+    cd backend
+    python bulk_import.py ../data --workers 4
+
+Finished files are written to the indexes in batches: each commit takes the
+cross-worker write lock only while it stores its batch and appends the
+changes to the index logs, so servers keep ingesting in between. The index
+files themselves are rewritten once, at the end of the run. Progress is
+recorded per file (size + mtime) in a JSON file after every commit, so an
+interrupted import resumes where it stopped and a re-run only picks up new
+or modified files.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = {'.txt', '.md'}
+JSON_EXTENSIONS = {'.json'}
+
+
+# ----------------------------------------------------------------------------
+# Parsing
+# ----------------------------------------------------------------------------
+
+def iter_json_values(raw: str) -> Iterator:
+    """
+    Yield JSON values from a file. Falls back to scanning for objects/arrays
+    that start a line, so annotated dumps like data/sample_artifacts.json
+    (prose and several JSON blocks in one file) still import.
+    """
+    try:
+        yield json.loads(raw)
+        return
+    except ValueError:
+        pass
+    decoder = json.JSONDecoder()
+    pos = 0
+    for match in re.finditer(r'^[\{\[]', raw, re.M):
+        if match.start() < pos:
+            continue
+        try:
+            value, pos = decoder.raw_decode(raw, match.start())
+        except ValueError:
+            continue
+        yield value
+
+
+def flatten(value, prefix: str = '') -> List[str]:
+    """Render nested JSON as 'key: value' lines"""
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            lines.extend(flatten(item, f'{prefix}{key}' if not prefix else f'{prefix}.{key}'))
+        return lines
+    if isinstance(value, list):
+        if all(not isinstance(v, (dict, list)) for v in value):
+            return [f'{prefix}: ' + ', '.join(str(v) for v in value)] if value else []
+        lines = []
+        for item in value:
+            lines.extend(flatten(item, prefix))
+        return lines
+    return [f'{prefix}: {value}' if prefix else str(value)]
+
+
+def json_records(value, name: str) -> List[Tuple[str, str]]:
+    """
+    Split a JSON value into (record name, text) documents. Lists of objects
+    become one document per object (named by its id when present); any
+    remaining top-level fields form one more document.
+    """
+    records = []
+    if isinstance(value, list):
+        value = {'records': value}
+    if not isinstance(value, dict):
+        return [(name, str(value))]
+    rest = {}
+    for key, item in value.items():
+        if isinstance(item, list) and item and all(isinstance(v, dict) for v in item):
+            for i, record in enumerate(item):
+                record_id = record.get('id') or record.get('query_id') or f'{key}_{i}'
+                records.append((f'{name}#{record_id}', '\n'.join(flatten(record))))
+        else:
+            rest[key] = item
+    if rest:
+        records.append((f'{name}#{"_".join(rest)[:60]}' if records else name, '\n'.join(flatten(rest))))
+    return records
+
+
+def parse_file(path: str, name: str) -> List[Tuple[str, str]]:
+    """Return (document name, text) pairs for one file"""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        raw = f.read()
+    if os.path.splitext(path)[1].lower() in JSON_EXTENSIONS:
+        docs = []
+        for i, value in enumerate(iter_json_values(raw)):
+            docs.extend(json_records(value, name if i == 0 else f'{name}@{i}'))
+        return docs
+    return [(name, raw)]
+
+
+def discover(root: str) -> List[str]:
+    """All importable files under root, sorted for a stable order"""
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            ext = os.path.splitext(filename)[1].lower()
+            if ext in TEXT_EXTENSIONS | JSON_EXTENSIONS:
+                found.append(os.path.join(dirpath, filename))
+    return sorted(found)
+
+
+# ----------------------------------------------------------------------------
+# Worker side (runs in the process pool)
+# ----------------------------------------------------------------------------
+
+_worker = {}
+
+
+def _init_worker(strategy: str, threads: int) -> None:
+    try:
+        import torch
+        torch.set_num_threads(threads)  # avoid oversubscribing cores across processes
+    except ImportError:
+        pass
+    from config import CHUNK_SIZE, CHUNK_TOKENS, CHUNK_OVERLAP
+    from embeddings import get_embedder
+    from chunker import make_chunker
+    _worker['embedder'] = get_embedder()
+    _worker['chunker'] = lambda: make_chunker(strategy, CHUNK_SIZE, CHUNK_TOKENS, CHUNK_OVERLAP)
+
+
+def _process_file(path: str, name: str):
+    """Parse, chunk and embed one file; returns (path, [(doc name, chunks, embeddings, metadatas)])"""
+    from chunker import chunk_text
+    from chunk_metadata import build_metadatas
+    out = []
+    for doc_name, text in parse_file(path, name):
+        pieces = chunk_text(text, _worker['chunker']())
+        chunks = [c for _, c in pieces]
+        embeddings = _worker['embedder'].embed_batches(chunks)
+        out.append((doc_name, chunks, embeddings, build_metadatas(chunks, doc_name, 0, [o for o, _ in pieces])))
+    return path, out
+
+
+# ----------------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------------
+
+class Progress:
+    """Resumable per-file import progress stored as JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = json.load(f)
+
+    @staticmethod
+    def fingerprint(path: str) -> Dict:
+        stat = os.stat(path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def is_done(self, path: str) -> bool:
+        entry = self.done.get(os.path.abspath(path))
+        return bool(entry) and all(entry.get(k) == v for k, v in self.fingerprint(path).items())
+
+    def mark(self, path: str, chunks: int) -> None:
+        self.done[os.path.abspath(path)] = {**self.fingerprint(path), 'chunks': chunks}
+
+    def save(self) -> None:
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.done, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+def run_import(root: str, workers: int, strategy: str, progress_path: str, commit_every: int) -> Dict:
+    """
+    Import every new or changed file under root.
+
+    Returns:
+        Summary with files imported, files skipped, chunks and elapsed seconds
+    """
+    import main as app  # configured store, BM25 index and index_chunks()
+
+    started = time.time()
+    progress = Progress(progress_path)
+    files = discover(root)
+    todo = [p for p in files if not progress.is_done(p)]
+    print(f'📚 {len(files)} files found, {len(files) - len(todo)} already imported, {len(todo)} to go')
+
+    threads = max(1, (os.cpu_count() or 1) // max(workers, 1))
+    uncommitted: List[Tuple[str, List]] = []  # embedded files waiting for the next commit
+    imported = chunks_total = 0
+
+    def commit():
+        nonlocal imported, chunks_total
+        if not uncommitted:
+            return
+        counts = []
+        # Appends to the index logs only; servers sharing the index catch up on them
+        with app.index_write(compact=False):
+            for path, docs in uncommitted:
+                count = 0
+                for doc_name, chunks, embeddings, metadatas in docs:
+                    # Changed files re-import as a diff against the registry. Workers
+                    # embed before the diff and dedup run, so both only save index
+                    # writes here, not embedding time
+                    update = app.get_registry().begin(doc_name)
+                    app.store_chunks(update, chunks, embeddings=embeddings, metadatas=metadatas)
+                    count += app.finish_update(update)['added']
+                counts.append((path, count))
+        for path, count in counts:
+            progress.mark(path, count)
+            imported += 1
+            chunks_total += count
+            print(f'  [{imported}/{len(todo)}] {path}: {count} chunks')
+        progress.save()
+        uncommitted.clear()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(strategy, threads)) as pool:
+        pending = set()
+        queue = iter(todo)
+        while True:
+            # Bounded in-flight window keeps parent memory flat for huge archives
+            while len(pending) < workers * 2:
+                path = next(queue, None)
+                if path is None:
+                    break
+                pending.add(pool.submit(_process_file, path, os.path.relpath(path, root).replace(os.sep, '/')))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                uncommitted.append(future.result())
+                if len(uncommitted) >= commit_every:
+                    commit()
+    commit()
+    if imported:
+        with app.index_write(compact=True):
+            pass  # rewrite every index file once, emptying the logs the run appended to
+
+    summary = {
+        'files_imported': imported,
+        'files_skipped': len(files) - len(todo),
+        'chunks': chunks_total,
+        'seconds': round(time.time() - started, 2),
+    }
+    print(f'✅ Import finished: {summary}')
+    return summary
+
+
+def main():
+    from config import CHUNK_STRATEGY
+
+    parser = argparse.ArgumentParser(description='Bulk-import a directory of TXT/JSON documents into the vector store')
+    parser.add_argument('directory', help='Directory to walk (e.g. ../data)')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1), help='Embedding processes')
+    parser.add_argument('--chunker', default=CHUNK_STRATEGY, help='window | sentence | paragraph')
+    parser.add_argument('--progress-file', default='./import_progress.json', help='Resumable progress record')
+    parser.add_argument('--commit-every', type=int, default=50, help='Files per index commit + progress save')
+    parser.add_argument('--restart', action='store_true', help='Ignore previous progress and import everything')
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.progress_file):
+        os.remove(args.progress_file)
+    run_import(args.directory, args.workers, args.chunker, args.progress_file, args.commit_every)
+
+
+if __name__ == '__main__':
+    main()
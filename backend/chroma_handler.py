@@ -1,16 +1,21 @@
-﻿import chromadb
-import os
+﻿from config import STORE_BATCH_SIZE, CHROMA_PATH, COLLECTION_NAME
+from vector_store import ChromaStore
 
-os.makedirs('chroma_data', exist_ok=True)
-client = chromadb.PersistentClient(path='./chroma_data')
-collection = client.get_or_create_collection('docs')
-print(' ChromaDB ready')
+store = None
+
+def get_store():
+    # Opened on first use rather than at import time
+    global store
+    if store is None:
+        store = ChromaStore(CHROMA_PATH, COLLECTION_NAME, STORE_BATCH_SIZE)
+        print(' ChromaDB ready')
+    return store
 
 def add(embeddings, texts, ids):
-    collection.add(embeddings=[e.tolist() for e in embeddings], documents=texts, ids=ids)
+    get_store().add(ids, embeddings, texts)
 
 def search(query_emb, k=4):
-    results = collection.query(query_embeddings=[query_emb.tolist()], n_results=k)
+    results = get_store().query(query_emb, n_results=k)
     return results['documents'][0] if results['documents'] else []
 
 db = {'add': add, 'search': search}
@@ -0,0 +1,118 @@
+"""
+Structured per-chunk metadata and query filters.
+
+Every stored chunk carries:
+    source       document name (upload filename / bulk-import record)
+    chunk_index  position within the document
+    offset       character offset within the document (when known)
+    site         most-mentioned known excavation site
+    period       most-mentioned cultural period / phase
+    date_start   earliest year mentioned (signed, BCE negative)
+    date_end     latest year mentioned
+    uploaded_at  ingest time (unix seconds)
+
+Missing values are omitted rather than stored as None (Chroma rejects
+None metadata values). Filters are expressed as Chroma `where` clauses so
+the same dict is passed to Chroma and evaluated by the NumPy store.
+"""
+
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+from timeline_generator import extract_dates
+
+SITES = [
+    'Mohenjo-daro', 'Harappa', 'Lothal', 'Dholavira', 'Kalibangan', 'Rakhigarhi', 'Chanhudaro',
+    'Banawali', 'Mehrgarh', 'Ganweriwala', 'Surkotada', 'Rupar', 'Alamgirpur', 'Shortugai',
+    'Sutkagan Dor', 'Kot Diji', 'Amri', 'Nausharo', 'Bhirrana', 'Farmana',
+]
+PERIODS = [
+    'Early Harappan', 'Mature Harappan', 'Late Harappan', 'Pre-Harappan', 'Neolithic', 'Chalcolithic',
+    'Bronze Age', 'Iron Age', 'Vedic', 'Mauryan', 'Gupta',
+]
+
+
+def _pattern(names: Sequence[str]) -> re.Pattern:
+    # Hyphens and spaces are interchangeable ("Mohenjo-Daro", "Mohenjo daro")
+    alternatives = [r'[-\s]?'.join(re.escape(part) for part in re.split(r'[-\s]', n)) for n in names]
+    return re.compile(r'\b(' + '|'.join(alternatives) + r')\b', re.I)
+
+
+_SITE_RE = _pattern(SITES)
+_PERIOD_RE = _pattern(PERIODS)
+_CANONICAL = {re.sub(r'[-\s]', '', n).lower(): n for n in SITES + PERIODS}
+
+
+def _most_mentioned(pattern: re.Pattern, text: str) -> Optional[str]:
+    names = Counter(_CANONICAL[re.sub(r'[-\s]', '', m).lower()] for m in pattern.findall(text))
+    return names.most_common(1)[0][0] if names else None
+
+
+def chunk_metadata(
+    text: str,
+    source: str,
+    chunk_index: int,
+    offset: Optional[int] = None,
+    uploaded_at: Optional[float] = None
+) -> Dict:
+    """Metadata dict for one chunk (keys with no value are left out)"""
+    meta = {'source': source, 'chunk_index': chunk_index, 'uploaded_at': uploaded_at or time.time()}
+    if offset is not None:
+        meta['offset'] = offset
+    site = _most_mentioned(_SITE_RE, text)
+    if site:
+        meta['site'] = site
+    period = _most_mentioned(_PERIOD_RE, text)
+    if period:
+        meta['period'] = period
+    dates = extract_dates(text)
+    if dates:
+        meta['date_start'] = min(d.start for d in dates)
+        meta['date_end'] = max(d.end for d in dates)
+    return meta
+
+
+def build_metadatas(
+    chunks: Sequence[str],
+    source: str,
+    first_index: int = 0,
+    offsets: Optional[Sequence[int]] = None
+) -> List[Dict]:
+    """Metadata for consecutive chunks of one document, sharing one upload time"""
+    now = time.time()
+    offsets = offsets if offsets is not None else [None] * len(chunks)
+    return [chunk_metadata(text, source, first_index + i, offset, now)
+            for i, (text, offset) in enumerate(zip(chunks, offsets))]
+
+
+def build_where(
+    source: Optional[str] = None,
+    site: Optional[str] = None,
+    period: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None
+) -> Optional[Dict]:
+    """
+    Chroma-style where clause for the query filters.
+
+    A year range keeps chunks whose mentioned dates overlap [year_from, year_to].
+
+    Returns:
+        None when no filter is set
+    """
+    clauses = []
+    if source:
+        clauses.append({'source': source})
+    if site:
+        clauses.append({'site': _CANONICAL.get(re.sub(r'[-\s]', '', site).lower(), site)})
+    if period:
+        clauses.append({'period': _CANONICAL.get(re.sub(r'[-\s]', '', period).lower(), period)})
+    if year_from is not None:
+        clauses.append({'date_end': {'$gte': year_from}})
+    if year_to is not None:
+        clauses.append({'date_start': {'$lte': year_to}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
@@ -0,0 +1,283 @@
+"""
+Incremental text chunkers.
+
+Chunkers are push-style: feed() text as it arrives and receive the chunks
+that are complete so far, then flush() at end of input. The same chunker
+therefore serves whole-string ingestion and streamed uploads, and a
+multi-hundred-MB file never has to be held in memory at once.
+
+Strategies:
+    window     Fixed character windows with 50% overlap (legacy)
+    sentence   Whole sentences packed up to a token target, small overlap
+    paragraph  Whole paragraphs packed up to a token target, small overlap
+"""
+
+import codecs
+import re
+from typing import AsyncIterator, Dict, List, Tuple
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_BOUNDARIES = {
+    # Sentence end (optionally closed by a quote/bracket) followed by whitespace, or a blank line
+    'sentence': re.compile(r'(?<=[.!?])["\')\]]*\s+|\n\s*\n\s*'),
+    'paragraph': re.compile(r'\n\s*\n\s*'),
+}
+
+
+def count_tokens(text: str) -> int:
+    """Cheap local token estimate: words plus punctuation marks"""
+    return len(_TOKEN_RE.findall(text))
+
+
+def truncate_tokens(text: str, limit: int) -> str:
+    """Prefix of text holding at most limit tokens (as counted by count_tokens)"""
+    for i, match in enumerate(_TOKEN_RE.finditer(text)):
+        if i == limit:
+            return text[:match.start()].rstrip()
+    return text
+
+
+class WindowChunker:
+    """
+    Fixed-size sliding windows, identical to
+    [text[i:i+size] for i in range(0, len(text), step)].
+    """
+
+    def __init__(self, size: int = 800, step: int = 400):
+        """
+        Args:
+            size: Window length in characters
+            step: Distance between window starts
+        """
+        if size <= 0 or step <= 0:
+            raise ValueError('size and step must be positive')
+        self.size = size
+        self.step = step
+        self._buffer = ''
+        self._offset = 0  # position of _buffer[0] in the full document
+
+    def feed(self, text: str) -> List[Tuple[int, str]]:
+        """
+        Add text and return the windows it completed.
+
+        Returns:
+            List of (character offset, chunk) pairs
+        """
+        buf = self._buffer + text
+        out = []
+        start = 0
+        while len(buf) - start >= self.size:
+            out.append((self._offset + start, buf[start:start + self.size]))
+            start += self.step
+        # Trim consumed text once per feed rather than once per window
+        start = min(start, len(buf))
+        self._buffer = buf[start:]
+        self._offset += start
+        return out
+
+    def flush(self) -> List[Tuple[int, str]]:
+        """Return the trailing (shorter) windows at end of input"""
+        out = []
+        for start in range(0, len(self._buffer), self.step):
+            out.append((self._offset + start, self._buffer[start:start + self.size]))
+        self._offset += len(self._buffer)
+        self._buffer = ''
+        return out
+
+
+class StructuredChunker:
+    """
+    Packs whole sentences (or paragraphs) into chunks of about
+    target_tokens, repeating at most overlap_tokens of trailing units in
+    the next chunk. Units longer than the target are split on whitespace.
+    Chunks never cut a word, and never cut a sentence unless it runs past
+    max_buffer characters: input without boundaries (say a paragraph-strategy
+    file with no blank lines) is then cut at its last whitespace, so the
+    buffer stays bounded while streaming.
+    """
+
+    def __init__(
+        self,
+        target_tokens: int = 200,
+        overlap_tokens: int = 30,
+        unit: str = 'sentence',
+        max_buffer: int = None
+    ):
+        """
+        Args:
+            target_tokens: Upper bound on tokens per chunk
+            overlap_tokens: Max tokens of trailing units repeated in the next chunk
+            unit: 'sentence' or 'paragraph'
+            max_buffer: Characters held while waiting for a boundary; default
+                about four chunks (target_tokens * 24)
+        """
+        if unit not in _BOUNDARIES:
+            raise ValueError(f'unit must be one of {sorted(_BOUNDARIES)}')
+        if target_tokens <= 0:
+            raise ValueError('target_tokens must be positive')
+        self.target = target_tokens
+        self.overlap = min(max(overlap_tokens, 0), target_tokens // 2)
+        self._boundary = _BOUNDARIES[unit]
+        self.max_buffer = max_buffer or target_tokens * 24
+        self._buffer = ''
+        self._offset = 0  # position of _buffer[0] in the full document
+        self._current: List[Tuple[int, str, int]] = []  # (offset, text, tokens)
+        self._current_tokens = 0
+        self._fresh = False  # current holds text not yet emitted
+
+    def feed(self, text: str) -> List[Tuple[int, str]]:
+        self._buffer += text
+        units = []
+        pos = 0
+        for match in self._boundary.finditer(self._buffer):
+            if match.end() == len(self._buffer):
+                break  # the separator may continue in the next piece
+            units.append((self._offset + pos, self._buffer[pos:match.end()]))
+            pos = match.end()
+        if len(self._buffer) - pos > self.max_buffer:
+            # No boundary in sight: cut after the last whitespace; _pack splits the
+            # piece into chunks and keeps only the overlap for the next one
+            last = max(self._buffer.rfind(c, pos) for c in ' \t\n\r')
+            cut = last + 1 if last >= 0 else len(self._buffer)  # one word that long is cut anyway
+            units.append((self._offset + pos, self._buffer[pos:cut]))
+            pos = cut
+        self._buffer = self._buffer[pos:]
+        self._offset += pos
+        return self._pack(units)
+
+    def flush(self) -> List[Tuple[int, str]]:
+        out = self._pack([(self._offset, self._buffer)] if self._buffer else [])
+        self._offset += len(self._buffer)
+        self._buffer = ''
+        if self._fresh:
+            out.append(self._emit())
+        self._current, self._current_tokens, self._fresh = [], 0, False
+        return out
+
+    def _split_long(self, offset: int, text: str) -> List[Tuple[int, str, int]]:
+        pieces = []
+        words = list(re.finditer(r'\S+\s*', text))
+        start = 0
+        while start < len(words):
+            end, tokens = start, 0
+            while end < len(words):
+                t = count_tokens(words[end].group())
+                if tokens and tokens + t > self.target:
+                    break
+                tokens += t
+                end += 1
+            a, b = words[start].start(), words[end - 1].end()
+            pieces.append((offset + a, text[a:b], tokens))
+            start = end
+        return pieces
+
+    def _pack(self, units: List[Tuple[int, str]]) -> List[Tuple[int, str]]:
+        out = []
+        for offset, text in units:
+            tokens = count_tokens(text)
+            if tokens == 0:
+                # Whitespace-only unit: keep it so chunk text stays contiguous
+                if self._current:
+                    self._current.append((offset, text, 0))
+                continue
+            parts = self._split_long(offset, text) if tokens > self.target else [(offset, text, tokens)]
+            for part in parts:
+                if self._fresh and self._current_tokens + part[2] > self.target:
+                    out.append(self._emit())
+                    self._keep_overlap()
+                self._current.append(part)
+                self._current_tokens += part[2]
+                self._fresh = True
+        return out
+
+    def _emit(self) -> Tuple[int, str]:
+        text = ''.join(t for _, t, _ in self._current)
+        lead = len(text) - len(text.lstrip())
+        return self._current[0][0] + lead, text.strip()
+
+    def _keep_overlap(self) -> None:
+        kept, tokens = [], 0
+        for unit in reversed(self._current):
+            if tokens + unit[2] > self.overlap:
+                break
+            kept.append(unit)
+            tokens += unit[2]
+        self._current = kept[::-1]
+        self._current_tokens = tokens
+        self._fresh = False
+
+
+def make_chunker(strategy: str, size: int = 800, target_tokens: int = 200, overlap_tokens: int = 30):
+    """
+    Build a chunker by strategy name.
+
+    Args:
+        strategy: 'window', 'sentence' or 'paragraph'
+        size: Window length in characters (window strategy, 50% overlap)
+        target_tokens: Tokens per chunk (sentence / paragraph)
+        overlap_tokens: Overlap in tokens (sentence / paragraph)
+    """
+    if strategy == 'window':
+        return WindowChunker(size, max(size // 2, 1))
+    if strategy in _BOUNDARIES:
+        return StructuredChunker(target_tokens, overlap_tokens, strategy)
+    raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+
+class ChunkReport:
+    """Accumulates per-document chunk statistics"""
+
+    def __init__(self, strategy: str):
+        self.strategy = strategy
+        self.chunks = 0
+        self.characters = 0
+        self.tokens = 0
+        self.max_tokens = 0
+
+    def add(self, chunks: List[str]) -> None:
+        for chunk in chunks:
+            tokens = count_tokens(chunk)
+            self.chunks += 1
+            self.characters += len(chunk)
+            self.tokens += tokens
+            self.max_tokens = max(self.max_tokens, tokens)
+
+    def as_dict(self) -> Dict:
+        return {
+            'strategy': self.strategy,
+            'chunks': self.chunks,
+            'characters': self.characters,
+            'avg_tokens': round(self.tokens / self.chunks, 1) if self.chunks else 0,
+            'max_tokens': self.max_tokens,
+        }
+
+
+def chunk_text(text: str, chunker) -> List[Tuple[int, str]]:
+    """Run a whole string through a chunker"""
+    return chunker.feed(text) + chunker.flush()
+
+
+async def aiter_decoded(read, block_size: int = 1 << 20, encoding: str = 'utf-8') -> AsyncIterator[str]:
+    """
+    Read and decode a byte stream block by block.
+
+    Args:
+        read: Async callable returning up to n bytes (e.g. UploadFile.read)
+        block_size: Bytes per read
+        encoding: Text encoding
+
+    Yields:
+        Decoded text; a multibyte character split across two blocks is
+        held back until its remaining bytes arrive
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while True:
+        block = await read(block_size)
+        if not block:
+            break
+        text = decoder.decode(block)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
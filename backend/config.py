@@ -6,8 +6,110 @@ load_dotenv()  # Load .env file
 # Get API key (no error checking for imports)
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 LLM_MODEL = os.getenv('LLM_MODEL', 'llama3-8b-8192')
-CHUNK_SIZE = 800
+LLM_BASE_URL = os.getenv('LLM_BASE_URL', 'https://api.groq.com/openai/v1')  # any OpenAI-compatible API
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '30'))
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '20'))
+CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', '800'))                 # window strategy: characters per chunk
+CHUNK_STRATEGY = os.getenv('CHUNK_STRATEGY', 'sentence')         # window | sentence | paragraph
+CHUNK_TOKENS = int(os.getenv('CHUNK_TOKENS', str(CHUNK_SIZE // 4)))  # sentence/paragraph target (~4 chars per token)
+CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', '30'))             # sentence/paragraph overlap in tokens
 TOP_K = 4
 
+# Load the embedding model and open the store in a background thread at startup
+WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', 'true').lower() == 'true'
+
+# Embedding / ingestion throughput
+EMBED_MODEL = os.getenv('EMBED_MODEL', 'all-MiniLM-L6-v2')
+EMBED_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', '64'))    # chunks per encode() call
+EMBED_WORKERS = int(os.getenv('EMBED_WORKERS', '1'))           # >1 spreads batches over a thread pool
+STORE_BATCH_SIZE = int(os.getenv('STORE_BATCH_SIZE', '1000'))  # rows per collection.add()
+
+# Embedding runtime: torch (SentenceTransformer) or onnx (onnxruntime, CPU)
+EMBED_RUNTIME = os.getenv('EMBED_RUNTIME', 'torch')
+ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', './onnx_model')     # exported on first use
+ONNX_QUANTIZE = os.getenv('ONNX_QUANTIZE', 'true').lower() == 'true'  # int8 dynamic quantization
+EMBED_THREADS = int(os.getenv('EMBED_THREADS', '0'))              # intra-op threads, 0 = runtime default
+
+# Vector store persistence
+VECTOR_BACKEND = os.getenv('VECTOR_BACKEND', 'chroma')  # chroma | numpy
+NUMPY_INDEX_PATH = os.getenv('NUMPY_INDEX_PATH', './numpy_index')
+NUMPY_PRECISION = os.getenv('NUMPY_PRECISION', 'float32')  # float32 | int8 (float16 searches as float32)
+RESCORE_FACTOR = int(os.getenv('RESCORE_FACTOR', '4'))  # compact search: rescore top k*factor at float32
+CHROMA_PATH = os.getenv('CHROMA_PATH', './chroma_data')
+COLLECTION_NAME = os.getenv('COLLECTION_NAME', 'docs')
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', './index_snapshot')  # embeddings.npy + chunks.jsonl
+
+# Retrieval: dense (vector only) or hybrid (vector + BM25 fused with reciprocal rank fusion)
+RETRIEVAL_MODE = os.getenv('RETRIEVAL_MODE', 'dense')
+HYBRID_CANDIDATES = int(os.getenv('HYBRID_CANDIDATES', '20'))  # per-ranker depth before fusion
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1000'))  # prompt context after merging overlapping chunks
+
+# Optional cross-encoder reranking of a wider candidate set (empty RERANK_MODEL disables)
+RERANK_MODEL = os.getenv('RERANK_MODEL', '')  # e.g. cross-encoder/ms-marco-MiniLM-L-6-v2
+RERANK_CANDIDATES = int(os.getenv('RERANK_CANDIDATES', '20'))
+RERANK_BUDGET_MS = float(os.getenv('RERANK_BUDGET_MS', '150'))  # per request; vector order when exceeded
+RERANK_BATCH_SIZE = int(os.getenv('RERANK_BATCH_SIZE', '16'))
+RERANK_CACHE_SIZE = int(os.getenv('RERANK_CACHE_SIZE', '4096'))
+BM25_PATH = os.getenv('BM25_PATH', './bm25_index.json')
+
+# Near-duplicate chunks at ingest: off | skip | link (skip, and remember which chunk it duplicates)
+DEDUP_MODE = os.getenv('DEDUP_MODE', 'link')
+DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', '0.8'))  # estimated Jaccard of character 5-grams
+DEDUP_PATH = os.getenv('DEDUP_PATH', './dedup_index.npz')
+
+# Timelines: dates extracted at ingest, filtered by BM25 relevance to the topic
+DATE_INDEX_PATH = os.getenv('DATE_INDEX_PATH', './date_index.json')
+TIMELINE_CANDIDATES = int(os.getenv('TIMELINE_CANDIDATES', '200'))  # BM25 depth for topic relevance
+TIMELINE_CACHE_SIZE = int(os.getenv('TIMELINE_CACHE_SIZE', '256'))
+
+# Per-document chunk hashes: re-uploads only embed changed chunks and delete removed ones
+DOCUMENT_REGISTRY_PATH = os.getenv('DOCUMENT_REGISTRY_PATH', './documents.json')
+# Index saves append changes to a .log next to each index; the index is rewritten
+# once its log exceeds this fraction of it
+INDEX_COMPACT_RATIO = float(os.getenv('INDEX_COMPACT_RATIO', '0.5'))
+
+# Streaming uploads: read/decode in blocks, embed + commit every STREAM_COMMIT_SIZE chunks
+UPLOAD_STREAMING = os.getenv('UPLOAD_STREAMING', 'true').lower() == 'true'
+UPLOAD_BLOCK_SIZE = int(os.getenv('UPLOAD_BLOCK_SIZE', str(1 << 20)))
+STREAM_COMMIT_SIZE = int(os.getenv('STREAM_COMMIT_SIZE', '512'))
+
+# Persistent embedding cache keyed by sha256(model, chunk text)
+EMBED_CACHE_ENABLED = os.getenv('EMBED_CACHE_ENABLED', 'true').lower() == 'true'
+EMBED_CACHE_PATH = os.getenv('EMBED_CACHE_PATH', './embedding_cache/embeddings.sqlite3')
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv('EMBED_CACHE_MAX_ENTRIES', '200000'))
+
+# Micro-batching of concurrent question embeddings (QUERY_BATCH_SIZE=1 disables)
+QUERY_BATCH_SIZE = int(os.getenv('QUERY_BATCH_SIZE', '32'))
+QUERY_BATCH_WAIT_MS = float(os.getenv('QUERY_BATCH_WAIT_MS', '2'))
+
+# /api/query/batch: questions per request and LLM completions in flight per request
+BATCH_QUERY_MAX = int(os.getenv('BATCH_QUERY_MAX', '64'))
+BATCH_QUERY_CONCURRENCY = int(os.getenv('BATCH_QUERY_CONCURRENCY', '8'))
+
+# Multi-worker serving (gunicorn -c gunicorn.conf.py main:app); workers share the persisted
+# numpy index and pick up each other's writes through a generation counter file
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', '1'))
+PORT = int(os.getenv('PORT', '8000'))
+INDEX_GENERATION_PATH = os.getenv('INDEX_GENERATION_PATH', './index.generation')
+INDEX_SYNC_INTERVAL = float(os.getenv('INDEX_SYNC_INTERVAL', '1.0'))  # seconds between checks; 0 disables
+
+# Per-stage latency histograms and counters served at /metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Audit logging (documents, queries) batched off the request path
+SUPABASE_URL = os.getenv('SUPABASE_URL')
+SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+AUDIT_SINK = os.getenv('AUDIT_SINK', 'supabase' if SUPABASE_URL else 'off')  # supabase | jsonl | off
+AUDIT_JSONL_PATH = os.getenv('AUDIT_JSONL_PATH', './audit_log/audit.jsonl')  # jsonl sink output
+AUDIT_SPILL_PATH = os.getenv('AUDIT_SPILL_PATH', './audit_log/spill.jsonl')  # overflow / failed rows (pid added per process)
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '100'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '1.0'))
+AUDIT_MAX_RETRIES = int(os.getenv('AUDIT_MAX_RETRIES', '3'))
+
+# In-memory query caches (question embeddings, corpus-versioned answers)
+QUERY_EMBED_CACHE_SIZE = int(os.getenv('QUERY_EMBED_CACHE_SIZE', '1024'))
+ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '512'))
+
 print(' Config loaded successfully')
 print(f' Key preview: {GROQ_API_KEY[:10] if GROQ_API_KEY else "MISSING"}...')
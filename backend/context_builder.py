@@ -0,0 +1,159 @@
+"""
+Token-budgeted prompt context from retrieved chunks.
+
+Chunks overlap by design (50% for the window strategy, a few sentences
+for the structured ones), so the top-k results of one question often
+repeat the same passage. Before the prompt is built:
+
+1. chunks of the same document that overlap or are consecutive are
+   merged into one passage, using the stored character offsets;
+2. passages whose text already appears in a more relevant passage are
+   dropped;
+3. passages are packed in relevance order into a token budget, counted
+   with the local tokenizer from chunker.py, truncating the last one
+   when enough room is left.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from chunker import count_tokens, truncate_tokens
+
+
+@dataclass
+class Passage:
+    text: str
+    rank: int                       # best retrieval rank among the merged chunks
+    ids: List[str]
+    source: Optional[str] = None
+    start: Optional[int] = None     # character span within the document, when known
+    end: Optional[int] = None
+    last_index: Optional[int] = None
+
+
+@dataclass
+class PackedContext:
+    text: str
+    passages: List[Passage] = field(default_factory=list)
+    tokens: int = 0                 # tokens in text
+    tokens_in: int = 0              # tokens the retrieved chunks would have cost joined as-is
+
+    @property
+    def sources(self) -> List[str]:
+        return [p.text for p in self.passages]
+
+    def stats(self) -> Dict:
+        return {
+            'tokens': self.tokens,
+            'tokens_saved': max(self.tokens_in - self.tokens, 0),
+            'passages': len(self.passages),
+        }
+
+
+class ContextBuilder:
+    """
+    Merges, deduplicates and packs retrieved chunks into prompt context.
+    """
+
+    def __init__(self, budget_tokens: int = 1000, min_tail_tokens: int = 50, separator: str = '\n\n'):
+        """
+        Args:
+            budget_tokens: Upper bound on context tokens
+            min_tail_tokens: Smallest leftover budget worth filling with a truncated passage
+            separator: Text between passages
+        """
+        self.budget = budget_tokens
+        self.min_tail = min_tail_tokens
+        self.separator = separator
+
+    def build(
+        self,
+        chunks: Sequence[str],
+        ids: Sequence[str],
+        metadatas: Optional[Sequence[Optional[Dict]]] = None
+    ) -> PackedContext:
+        """
+        Args:
+            chunks: Retrieved chunk texts, most relevant first
+            ids: Their chunk ids
+            metadatas: Their stored metadata (source / offset / chunk_index), if any
+
+        Returns:
+            PackedContext with the prompt text and the passages it holds
+        """
+        metadatas = metadatas or [None] * len(chunks)
+        passages = self._dedupe(self._merge(chunks, ids, metadatas))
+        packed, used = [], 0
+        for passage in passages:
+            tokens = count_tokens(passage.text)
+            room = self.budget - used
+            if tokens > room:
+                if room < self.min_tail and packed:
+                    continue  # a smaller passage further down may still fit
+                passage.text = truncate_tokens(passage.text, room)
+                tokens = count_tokens(passage.text)
+                if not tokens:
+                    continue
+            packed.append(passage)
+            used += tokens
+        text = self.separator.join(p.text for p in packed)
+        return PackedContext(text, packed, count_tokens(text), sum(count_tokens(c) for c in chunks))
+
+    @staticmethod
+    def _merge(chunks, ids, metadatas) -> List[Passage]:
+        passages, by_source = [], {}
+        for rank, (text, chunk_id, meta) in enumerate(zip(chunks, ids, metadatas)):
+            meta = meta or {}
+            passage = Passage(text, rank, [chunk_id], meta.get('source'), last_index=meta.get('chunk_index'))
+            if meta.get('offset') is not None and passage.source is not None:
+                passage.start, passage.end = meta['offset'], meta['offset'] + len(text)
+                by_source.setdefault(passage.source, []).append(passage)
+            else:
+                passages.append(passage)
+        for group in by_source.values():
+            group.sort(key=lambda p: p.start)
+            current = group[0]
+            for nxt in group[1:]:
+                if _join(current, nxt):
+                    continue
+                passages.append(current)
+                current = nxt
+            passages.append(current)
+        return sorted(passages, key=lambda p: p.rank)
+
+    @staticmethod
+    def _dedupe(passages: List[Passage]) -> List[Passage]:
+        kept, seen = [], []
+        for passage in passages:
+            normalized = ' '.join(passage.text.split()).lower()
+            if any(normalized in other for other in seen):
+                continue
+            kept.append(passage)
+            seen.append(normalized)
+        return kept
+
+
+def _join(current: Passage, nxt: Passage) -> bool:
+    """Extend current with nxt if they overlap or are consecutive chunks"""
+    if nxt.end <= current.end:
+        # Inside the current span (e.g. a shorter chunk of the same passage)
+        if current.text[nxt.start - current.start:nxt.end - current.start] != nxt.text:
+            return False
+        current.ids += nxt.ids
+        current.rank = min(current.rank, nxt.rank)
+        return True
+    overlap = current.end - nxt.start
+    if overlap > 0:
+        # Offsets can disagree with the text if the document changed between chunks
+        if current.text[len(current.text) - overlap:] != nxt.text[:overlap]:
+            return False
+        current.text += nxt.text[overlap:]
+    elif current.last_index is not None and nxt.last_index == current.last_index + 1:
+        current.text += ' ' + nxt.text
+    else:
+        return False
+    current.end = nxt.end
+    current.last_index = nxt.last_index
+    current.ids += nxt.ids
+    current.rank = min(current.rank, nxt.rank)
+    return True
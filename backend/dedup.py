@@ -0,0 +1,296 @@
+"""
+Near-duplicate chunk detection with MinHash + LSH.
+
+Re-typed copies and revisions of the same excavation notes differ by a
+few characters, so exact hashing misses them. Each chunk gets a MinHash
+signature over character 5-gram shingles of its normalized text; the
+signature is split into LSH bands so a lookup only compares against
+chunks that share at least one band, and candidates are confirmed by the
+estimated Jaccard similarity. Signatures persist in an .npz file next to
+the other indexes, with later changes appended to a log beside it (see
+delta_log.py) until the file is rewritten.
+"""
+
+import base64
+import logging
+import os
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from delta_log import DeltaLog, file_bytes, latest
+
+logger = logging.getLogger(__name__)
+
+_PRIME = (1 << 61) - 1
+_SHINGLE = 5
+
+
+def shingles(text: str, size: int = _SHINGLE) -> List[int]:
+    """CRC32 hashes of the character shingles of lowercased, whitespace-collapsed text"""
+    text = re.sub(r'\s+', ' ', text.lower()).strip()
+    if len(text) <= size:
+        return [zlib.crc32(text.encode('utf-8'))] if text else []
+    encoded = text.encode('utf-8')
+    return list({zlib.crc32(encoded[i:i + size]) for i in range(len(encoded) - size + 1)})
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash/LSH index over chunk ids.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        seed: int = 1,
+        compact_ratio: float = 0.5
+    ):
+        """
+        Args:
+            path: .npz file to load from and save() to
+            threshold: Estimated Jaccard similarity at which chunks count as duplicates
+            num_perm: Signature length (permutations)
+            bands: LSH bands; num_perm / bands rows each
+            seed: Permutation seed (must stay fixed for a persisted index)
+            compact_ratio: Log size, relative to the .npz file, that triggers a rewrite
+        """
+        if num_perm % bands:
+            raise ValueError('num_perm must be divisible by bands')
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+        self._lock = threading.RLock()
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+        self.links: Dict[str, str] = {}  # duplicate chunk id -> canonical chunk id
+        self._changed = set()  # chunk ids (signature or link) to log on the next save()
+        self._log = DeltaLog(f'{path}.log', compact_ratio) if path else None
+        if path and os.path.exists(path):
+            self._load(path)
+        if self._log:
+            self._apply(latest(self._log.read(initial=True)))
+            self._changed.clear()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (uint32) of a chunk"""
+        hashes = np.asarray(shingles(text), dtype=np.uint64)
+        if not len(hashes):
+            return np.zeros(self.num_perm, dtype=np.uint32)
+        # a*h + b stays below 2**64 because a, b and h are all 32-bit
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % np.uint64(_PRIME)
+        return (permuted.min(axis=1) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def find(self, text: str = None, signature: np.ndarray = None, exclude=()) -> Optional[Tuple[str, float]]:
+        """
+        Most similar indexed chunk at or above the threshold, ignoring ids in exclude.
+
+        Returns:
+            (chunk id, estimated Jaccard) or None
+        """
+        signature = self.signature(text) if signature is None else signature
+        best = None
+        with self._lock:
+            candidates = set()
+            for band, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(band.get(key, ()))
+            for chunk_id in candidates.difference(exclude):
+                similarity = float(np.mean(self._signatures[chunk_id] == signature))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (chunk_id, similarity)
+        return best
+
+    def add(self, chunk_id: str, text: str = None, signature: np.ndarray = None) -> None:
+        """Index one chunk (re-adding an id replaces its signature)"""
+        signature = self.signature(text) if signature is None else signature
+        with self._lock:
+            self._unindex(chunk_id)
+            self._signatures[chunk_id] = signature
+            for band, key in zip(self._buckets, self._band_keys(signature)):
+                band.setdefault(key, []).append(chunk_id)
+            self._changed.add(chunk_id)
+
+    def filter(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        link: bool = True,
+        exclude=()
+    ) -> Tuple[List[int], Dict[str, str]]:
+        """
+        Split incoming chunks into new ones and near-duplicates, indexing the new ones.
+
+        A chunk whose best match is its own id (the same document re-uploaded)
+        is kept so it gets re-indexed. Chunks are also checked against earlier
+        chunks of the same call.
+
+        Args:
+            ids: Incoming chunk ids
+            texts: Chunk texts
+            link: Remember duplicate -> canonical ids in self.links
+            exclude: Ids that never count as a match (e.g. the version of the
+                document being replaced, which an edited chunk resembles)
+
+        Returns:
+            (positions of chunks to keep, {duplicate id: canonical id})
+        """
+        keep, duplicates = [], {}
+        with self._lock:
+            for i, (chunk_id, text) in enumerate(zip(ids, texts)):
+                signature = self.signature(text)
+                own = self._signatures.get(chunk_id)
+                if own is not None and np.mean(own == signature) >= self.threshold:
+                    match = None  # same chunk re-uploaded: re-index in place
+                else:
+                    match = self.find(signature=signature, exclude=exclude)
+                if match is not None and match[0] != chunk_id:
+                    duplicates[chunk_id] = match[0]
+                    continue
+                self.add(chunk_id, signature=signature)
+                keep.append(i)
+            if link and duplicates:
+                self.links.update(duplicates)
+                self._changed.update(duplicates)
+        return keep, duplicates
+
+    def remove(self, ids) -> None:
+        """Forget chunks and any links to or from them"""
+        ids = set(ids)
+        with self._lock:
+            for chunk_id in ids:
+                self._unindex(chunk_id)
+            stale = [d for d, c in self.links.items() if d in ids or c in ids]
+            for duplicate in stale:
+                del self.links[duplicate]
+            self._changed.update(ids)
+            self._changed.update(stale)
+
+    def _unindex(self, chunk_id: str) -> None:
+        signature = self._signatures.pop(chunk_id, None)
+        if signature is None:
+            return
+        for band, key in zip(self._buckets, self._band_keys(signature)):
+            members = band.get(key)
+            if members and chunk_id in members:
+                members.remove(chunk_id)
+                if not members:
+                    del band[key]
+
+    def link(self, duplicates: Dict[str, str]) -> None:
+        """Remember duplicate -> canonical ids (e.g. re-pointed after a canonical chunk was removed)"""
+        with self._lock:
+            self.links.update(duplicates)
+            self._changed.update(duplicates)
+
+    def duplicates_of(self, chunk_id: str) -> List[str]:
+        """Linked duplicate ids of a canonical chunk"""
+        return [d for d, c in self.links.items() if c == chunk_id]
+
+    def stats(self) -> Dict:
+        return {'chunks': len(self), 'linked_duplicates': len(self.links), 'threshold': self.threshold}
+
+    def save(self, path: str = None, compact: Optional[bool] = None) -> None:
+        """
+        Persist changes since the last save.
+
+        Args:
+            path: Write a full copy here instead (e.g. for a backup)
+            compact: Force (True) or suppress (False) rewriting the .npz file;
+                None rewrites once the log is large
+        """
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            if path != self.path:
+                self._write(path)
+                return
+            if not self._changed and not compact and self._log.exists():
+                return
+            records = []
+            for chunk_id in self._changed:
+                signature = self._signatures.get(chunk_id)
+                if signature is None and chunk_id not in self.links:
+                    records.append({'key': chunk_id, 'value': None})
+                    continue
+                records.append({'key': chunk_id, 'value': {
+                    'signature': base64.b64encode(signature.tobytes()).decode('ascii') if signature is not None else None,
+                    'link': self.links.get(chunk_id),
+                }})
+            self._log.save(records, lambda: self._write(path), file_bytes(path), compact)
+            self._changed.clear()
+
+    def refresh(self) -> bool:
+        """
+        Apply changes other processes saved since this index was loaded.
+
+        Returns:
+            False when the index has to be reloaded instead (file rewritten)
+        """
+        if not self._log:
+            return True
+        with self._lock:
+            records = self._log.read()
+            if records is None:
+                return False
+            pending, self._changed = self._changed, set()
+            self._apply(latest(records))
+            self._changed = pending
+            return True
+
+    def _apply(self, changes: Dict[str, Optional[Dict]]) -> None:
+        for chunk_id, value in changes.items():
+            if value is None:
+                self.remove([chunk_id])
+                continue
+            if value['signature'] is not None:
+                self.add(chunk_id, signature=np.frombuffer(base64.b64decode(value['signature']), dtype=np.uint32))
+            else:
+                self._unindex(chunk_id)
+            if value['link'] is not None:
+                self.links[chunk_id] = value['link']
+            else:
+                self.links.pop(chunk_id, None)
+
+    def _write(self, path: str) -> None:
+        """Write signatures and links as .npz (atomic replace)"""
+        ids = list(self._signatures)
+        matrix = np.stack([self._signatures[i] for i in ids]) if ids else np.zeros((0, self.num_perm), np.uint32)
+        tmp = f'{path}.tmp.npz'
+        np.savez(
+            tmp,
+            ids=np.array(ids, dtype=str),
+            signatures=matrix,
+            link_from=np.array(list(self.links), dtype=str),
+            link_to=np.array(list(self.links.values()), dtype=str),
+            params=np.array([self.num_perm, self.bands], dtype=np.int64),
+        )
+        os.replace(tmp, path)
+
+    def _load(self, path: str) -> None:
+        with np.load(path) as data:
+            if tuple(data['params']) != (self.num_perm, self.bands):
+                logger.warning(f"Ignoring dedup index {path}: built with different parameters")
+                return
+            for chunk_id, signature in zip(data['ids'].tolist(), data['signatures']):
+                self.add(chunk_id, signature=signature)
+            self.links = dict(zip(data['link_from'].tolist(), data['link_to'].tolist()))
+        self._changed.clear()
+        logger.info(f"Loaded dedup index with {len(self)} chunks")
@@ -0,0 +1,133 @@
+"""
+Append-only change logs for the persisted indexes.
+
+Each index (vector store, BM25, date index, dedup signatures, document
+registry) persists as a base file plus a JSONL log next to it. A save
+appends one record per changed key (chunk id or document name) holding
+the key's new state, or None once it is gone, so its cost follows the
+size of the edit rather than the corpus. Records are upserts: replaying
+one that the base already contains is harmless, and the last record for
+a key wins.
+
+Once the log outgrows compact_ratio times the base, the save rewrites the
+base and starts a new log. The first line of a log names its epoch, so a
+process that loaded the previous base notices and reloads instead of
+replaying the tail of a log that no longer matches it.
+
+Writers must hold the cross-process write lock (index_sync.py) and have
+read every record before appending.
+"""
+
+import json
+import logging
+import os
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DeltaLog:
+    """
+    Change log of one index, tracking how far this process has read it.
+    """
+
+    def __init__(self, path: str, compact_ratio: float = 0.5, min_compact_bytes: int = 1 << 20):
+        """
+        Args:
+            path: Log file (conventionally the base path + '.log')
+            compact_ratio: Log size, relative to the base, that triggers a rewrite
+            min_compact_bytes: Logs smaller than this never trigger a rewrite
+        """
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+        self.epoch = None  # epoch of the log this process follows
+        self.offset = 0    # bytes of it already applied
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def read(self, initial: bool = False) -> Optional[List[Dict]]:
+        """
+        Records appended since the last read or append.
+
+        Args:
+            initial: The caller just loaded the base; follow whatever log is there
+
+        Returns:
+            Records in order, or None when the log was restarted since (the
+            base was rewritten: reload the index instead)
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return [] if initial or self.epoch is None else None
+        with f:
+            header = f.readline()
+            if not header.endswith(b'\n'):
+                return [] if initial or self.epoch is None else None  # log being created
+            epoch = json.loads(header)['epoch']
+            if initial:
+                self.epoch, self.offset = epoch, len(header)
+            elif epoch != self.epoch:
+                return None
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1  # a partly written last line waits for the next read
+        self.offset += end
+        return [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+
+    def append(self, records: List[Dict]) -> None:
+        with open(self.path, 'ab') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+            self.offset = f.tell()
+
+    def restart(self) -> None:
+        """Start an empty log under a new epoch (after the base was rewritten)"""
+        header = (json.dumps({'epoch': os.urandom(8).hex()}) + '\n').encode('utf-8')
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(header)
+        os.replace(tmp, self.path)
+        self.epoch, self.offset = json.loads(header)['epoch'], len(header)
+
+    def save(self, records: List[Dict], write_base: Callable[[], None], base_bytes: int, compact: Optional[bool] = None) -> bool:
+        """
+        Persist changes: append them, then rewrite the base if due.
+
+        The records are appended even when the base is rewritten next, so a
+        crash between the two steps still leaves every change in the log.
+
+        Args:
+            records: Changed keys as {'key', 'value'} records
+            write_base: Writes the complete index to its base file
+            base_bytes: Current size of the base
+            compact: Force (True) or suppress (False) the rewrite; None decides by size
+
+        Returns:
+            Whether the base was rewritten
+        """
+        if not self.exists():
+            compact = True  # first save, or a base written before logs existed
+        elif records:
+            self.append(records)
+        if compact is None:
+            compact = self.offset > max(self.min_compact_bytes, self.compact_ratio * base_bytes)
+        if compact:
+            write_base()
+            self.restart()
+            logger.info(f"Compacted {self.path}")
+        return compact
+
+
+def latest(records: List[Dict]) -> Dict:
+    """{key: value} keeping the last record per key"""
+    return {record['key']: record['value'] for record in records}
+
+
+def file_bytes(path: str) -> int:
+    """Size of a file, or of the files in a directory (0 if missing)"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path) if os.path.exists(path) else 0
@@ -0,0 +1,310 @@
+"""
+Registry of ingested documents and their chunk hashes.
+
+Each document records the content hash and id of every chunk, in order.
+Re-ingesting a document is then a diff: chunks whose text is unchanged
+keep their id (no embedding, no store write), new or edited text gets a
+fresh id from a per-document counter, and ids that no longer appear are
+deleted. Ids keep the `{filename}_{n}` form but n is no longer the chunk
+position, so an insertion near the top does not renumber everything
+after it; the position lives in the chunk metadata instead.
+
+A chunk skipped as a near-duplicate is registered unstored, with the id of
+the chunk it duplicated. When that chunk is removed, reassign() hands its
+place to the first such duplicate so its document keeps the text searchable.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from delta_log import DeltaLog, file_bytes, latest
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class DocumentRegistry:
+    """
+    Persistent {document: chunk hashes and ids} map, saved as JSON.
+
+    save() appends the entries of changed documents to a log next to the
+    JSON file (see delta_log.py) and rewrites the file itself only once the
+    log has grown past compact_ratio of it.
+    """
+
+    def __init__(self, path: str = None, compact_ratio: float = 0.5):
+        """
+        Args:
+            path: JSON file to load from and save() to
+            compact_ratio: Log size, relative to the JSON file, that triggers a rewrite
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._documents: Dict[str, Dict] = {}
+        # canonical chunk id -> {(document, chunk id)} of unstored duplicates of it
+        self._duplicates: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        self._changed = set()  # documents to log on the next save()
+        self._log = DeltaLog(f'{path}.log', compact_ratio) if path else None
+        if path and os.path.exists(path):
+            self._load(path)
+        if self._log:
+            self._apply(latest(self._log.read(initial=True)))
+            self._changed.clear()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, source: str) -> bool:
+        return source in self._documents
+
+    def get(self, source: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._documents.get(source)
+            return None if entry is None else {**entry, 'chunks': list(entry['chunks'])}
+
+    def documents(self) -> List[Dict]:
+        """Summary of every registered document"""
+        with self._lock:
+            return [
+                {
+                    'source': source,
+                    'chunks': len(entry['chunks']),
+                    'stored': sum(1 for c in entry['chunks'] if c['stored']),
+                    'updated_at': entry['updated_at'],
+                }
+                for source, entry in sorted(self._documents.items())
+            ]
+
+    def track(self, source: str, chunk_id: str, text: str) -> None:
+        """Register an already stored chunk (used to adopt chunks ingested before the registry)"""
+        with self._lock:
+            entry = self._documents.setdefault(source, {'chunks': [], 'next_id': 0, 'updated_at': time.time()})
+            entry['chunks'].append({'hash': chunk_hash(text), 'id': chunk_id, 'stored': True})
+            suffix = chunk_id.rsplit('_', 1)[-1]
+            if suffix.isdigit():
+                entry['next_id'] = max(entry['next_id'], int(suffix) + 1)
+            self._changed.add(source)
+
+    def begin(self, source: str) -> 'DocumentUpdate':
+        """Start re-ingesting a document (new documents diff against nothing)"""
+        return DocumentUpdate(self, source)
+
+    def _allocate(self, source: str, count: int) -> List[str]:
+        # Reserved immediately so concurrent updates of one document never share ids
+        with self._lock:
+            entry = self._documents.setdefault(source, {'chunks': [], 'next_id': 0, 'updated_at': time.time()})
+            first = entry['next_id']
+            entry['next_id'] += count
+            self._changed.add(source)
+        return [f'{source}_{i}' for i in range(first, first + count)]
+
+    def _commit(self, source: str, chunks: List[Dict]) -> None:
+        with self._lock:
+            entry = self._documents.setdefault(source, {'chunks': [], 'next_id': 0})
+            self._reference(source, entry, False)
+            entry['chunks'] = chunks
+            entry['updated_at'] = time.time()
+            self._reference(source, entry, True)
+            self._changed.add(source)
+
+    def _reference(self, source: str, entry: Dict, add: bool) -> None:
+        # Keep the canonical -> duplicates map in step with one document's chunks
+        for c in entry['chunks']:
+            canonical = c.get('duplicate_of')
+            if canonical is None:
+                continue
+            if add:
+                self._duplicates[canonical].add((source, c['id']))
+            else:
+                self._duplicates[canonical].discard((source, c['id']))
+                if not self._duplicates[canonical]:
+                    del self._duplicates[canonical]
+
+    def reassign(self, canonical: str) -> Optional[Tuple[str, str, int, List[Tuple[str, str]]]]:
+        """
+        Hand the place of a chunk being removed to its first unstored duplicate.
+
+        The duplicate is registered as stored, and any other duplicates of the
+        removed chunk now point at it; the caller stores its text.
+
+        Returns:
+            (document, chunk id, position in the document, [(document, chunk id)]
+            of the re-pointed duplicates), or None if nothing duplicated the chunk
+        """
+        with self._lock:
+            referrers = sorted(self._duplicates.pop(canonical, ()))
+            if not referrers:
+                return None
+            (source, heir), others = referrers[0], referrers[1:]
+            # Chunk dicts are shared with copies handed out by get(): replace, never mutate
+            chunks = self._documents[source]['chunks']
+            position = next(i for i, c in enumerate(chunks) if c['id'] == heir)
+            chunks[position] = {'hash': chunks[position]['hash'], 'id': heir, 'stored': True}
+            self._changed.add(source)
+            for other_source, chunk_id in others:
+                chunks = self._documents[other_source]['chunks']
+                i = next(i for i, c in enumerate(chunks) if c['id'] == chunk_id)
+                chunks[i] = {**chunks[i], 'duplicate_of': heir}
+                self._duplicates[heir].add((other_source, chunk_id))
+                self._changed.add(other_source)
+            return source, heir, position, others
+
+    def remove(self, source: str) -> List[str]:
+        """
+        Forget a document.
+
+        Returns:
+            Ids of its stored chunks (empty if the document is unknown)
+        """
+        with self._lock:
+            entry = self._documents.pop(source, None)
+            if entry is None:
+                return []
+            self._reference(source, entry, False)
+            self._changed.add(source)
+            return [c['id'] for c in entry['chunks'] if c['stored']]
+
+    def save(self, path: str = None, compact: Optional[bool] = None) -> None:
+        """
+        Persist changes since the last save.
+
+        Args:
+            path: Write a full copy here instead (e.g. for a backup)
+            compact: Force (True) or suppress (False) rewriting the JSON file;
+                None rewrites once the log is large
+        """
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            if path != self.path:
+                self._write(path)
+                return
+            if not self._changed and not compact and self._log.exists():
+                return
+            records = [{'key': source, 'value': self._documents.get(source)} for source in self._changed]
+            self._log.save(records, lambda: self._write(path), file_bytes(path), compact)
+            self._changed.clear()
+
+    def refresh(self) -> bool:
+        """
+        Apply changes other processes saved since this registry was loaded.
+
+        Returns:
+            False when the registry has to be reloaded instead (file rewritten)
+        """
+        if not self._log:
+            return True
+        with self._lock:
+            records = self._log.read()
+            if records is None:
+                return False
+            self._apply(latest(records))  # whole entries, never logged again here
+            return True
+
+    def _apply(self, changes: Dict[str, Optional[Dict]]) -> None:
+        for source, entry in changes.items():
+            previous = self._documents.pop(source, None)
+            if previous is not None:
+                self._reference(source, previous, False)
+            if entry is not None:
+                self._documents[source] = entry
+                self._reference(source, entry, True)
+
+    def _write(self, path: str) -> None:
+        """Write the registry as JSON (atomic replace)"""
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'documents': self._documents}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def _load(self, path: str) -> None:
+        with open(path, encoding='utf-8') as f:
+            self._documents = json.load(f)['documents']
+        for source, entry in self._documents.items():
+            self._reference(source, entry, True)
+        logger.info(f"Loaded document registry with {len(self._documents)} documents")
+
+
+class DocumentUpdate:
+    """
+    One re-ingestion of a document, diffed chunk by chunk against the
+    registered version. Chunks may arrive in several batches (streaming
+    upload); stale ids are only known once the last batch is in.
+    """
+
+    def __init__(self, registry: DocumentRegistry, source: str):
+        self.registry = registry
+        self.source = source
+        previous = registry.get(source)
+        old = previous['chunks'] if previous else []
+        self.previous_ids = {c['id'] for c in old if c['stored']}
+        self._unmatched: Dict[str, List[Dict]] = defaultdict(list)
+        for c in old:
+            # Chunks skipped as near-duplicates are not reused: they go through
+            # dedup again, since the chunk they duplicated may be gone by now
+            if c['stored']:
+                self._unmatched[c['hash']].append(c)
+        self._chunks: List[Dict] = []
+        self.counts = {'unchanged': 0, 'added': 0, 'removed': 0}
+
+    def assign(self, chunks: Sequence[str]) -> Tuple[List[str], List[int]]:
+        """
+        Match a batch of chunks against the previous version.
+
+        Returns:
+            (id per chunk, positions of chunks that need embedding and storing)
+        """
+        fresh, entries = [], []
+        for i, text in enumerate(chunks):
+            digest = chunk_hash(text)
+            if self._unmatched.get(digest):
+                entry = self._unmatched[digest].pop(0)
+                self.counts['unchanged'] += 1
+            else:
+                entry = {'hash': digest, 'id': None, 'stored': True}
+                fresh.append(i)
+            entries.append(entry)
+        new_ids = iter(self.registry._allocate(self.source, len(fresh)))
+        for position in fresh:
+            entries[position]['id'] = next(new_ids)
+        self._chunks.extend(entries)
+        self.counts['added'] += len(fresh)
+        return [e['id'] for e in entries], fresh
+
+    def mark_missing(self, ids: Sequence[str]) -> None:
+        """Record unchanged chunks the store no longer holds; they are stored again as added"""
+        self.counts['unchanged'] -= len(ids)
+        self.counts['added'] += len(ids)
+
+    def mark_duplicates(self, duplicates: Dict[str, str]) -> None:
+        """Record fresh chunks skipped as near-duplicates ({id: canonical id}, not stored)"""
+        for entry in self._chunks:
+            if entry['id'] in duplicates and entry['stored']:
+                entry['stored'] = False
+                entry['duplicate_of'] = duplicates[entry['id']]
+                self.counts['added'] -= 1
+
+    def stale_ids(self) -> List[str]:
+        """Stored ids of the previous version that no longer appear"""
+        return [c['id'] for entries in self._unmatched.values() for c in entries if c['stored']]
+
+    def commit(self) -> Dict:
+        """
+        Record the new version in the registry.
+
+        Returns:
+            Counts of unchanged, added and removed chunks
+        """
+        self.counts['removed'] = len(self.stale_ids())
+        self.registry._commit(self.source, self._chunks)
+        return dict(self.counts)
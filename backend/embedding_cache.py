@@ -0,0 +1,162 @@
+"""
+Content-addressed, disk-backed embedding cache.
+
+Vectors are keyed by sha256(model name + chunk text), so re-uploading the
+same or an overlapping document costs a SQLite lookup instead of a model
+forward pass. The cache is bounded by entry count and evicts the least
+recently used vectors first.
+
+Lookups stay read-only: recency updates are buffered and written with the
+next put (or once enough pile up), and the entry count is tracked in
+memory instead of counted per write. Other processes sharing the file add
+rows this count does not see, so it is re-read from the table whenever
+it reaches the limit.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Persistent LRU cache of float32 embeddings stored in a SQLite file.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200_000, touch_batch: int = 1024):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite file path; parent directories are created
+            max_entries: Upper bound on cached vectors before LRU eviction
+            touch_batch: Buffered recency updates that force a write from a lookup
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self._touched: Dict[str, float] = {}  # key -> last use not yet written
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings ('
+            ' key TEXT PRIMARY KEY,'
+            ' vector BLOB NOT NULL,'
+            ' last_used REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)')
+        self._conn.commit()
+        self._entries = self._count()
+        logger.info(f"✅ Embedding cache at {path} ({self._entries} vectors)")
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        """Return the content address for a (model, text) pair"""
+        return hashlib.sha256(f'{model_name}\0{text}'.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up several keys at once and refresh their recency.
+
+        Args:
+            keys: Content addresses from key()
+
+        Returns:
+            Mapping of found keys to float32 vectors (missing keys are absent)
+        """
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                marks = ','.join('?' * len(part))
+                rows = self._conn.execute(
+                    f'SELECT key, vector FROM embeddings WHERE key IN ({marks})', part
+                ).fetchall()
+                for k, blob in rows:
+                    found[k] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                self._touched.update((k, now) for k in found)
+                if len(self._touched) >= self.touch_batch:
+                    self._flush_touched()
+                    self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        """
+        Store vectors and evict the least recently used overflow.
+
+        Args:
+            items: Mapping of content address to embedding
+        """
+        if not items:
+            return
+        now = time.time()
+        rows = [(k, np.asarray(v, dtype=np.float32).tobytes(), now) for k, v in items.items()]
+        with self._lock:
+            self._flush_touched()
+            before = self._conn.total_changes
+            # Keys are content addresses, so a stored row already holds this vector
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)', rows
+            )
+            inserted = self._conn.total_changes - before
+            if inserted < len(rows):
+                self._conn.executemany('UPDATE embeddings SET last_used = ? WHERE key = ?', [(now, k) for k, _, _ in rows])
+            self._entries += inserted
+            if self._entries > self.max_entries:
+                self._entries = self._count()
+                overflow = self._entries - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        'DELETE FROM embeddings WHERE key IN '
+                        '(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)',
+                        (overflow,)
+                    )
+                    self._entries -= overflow
+                    logger.info(f"Evicted {overflow} cached embeddings")
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                'UPDATE embeddings SET last_used = ? WHERE key = ?',
+                [(t, k) for k, t in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and current size"""
+        return {'entries': self._entries, 'hits': self.hits, 'misses': self.misses}
+
+    def _count(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def close(self) -> None:
+        """Write buffered recency updates and close the underlying database"""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
@@ -1,12 +1,188 @@
-﻿from sentence_transformers import SentenceTransformer
-import numpy as np
+﻿import numpy as np
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union
+from config import (
+    EMBED_MODEL, EMBED_BATCH_SIZE, EMBED_WORKERS,
+    EMBED_RUNTIME, ONNX_MODEL_DIR, ONNX_QUANTIZE, EMBED_THREADS,
+    EMBED_CACHE_ENABLED, EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES,
+)
+from embedding_cache import EmbeddingCache
 
-print('🔄 Loading embeddings...')
-model = SentenceTransformer('all-MiniLM-L6-v2')
-print(' Embeddings ready')
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingManager:
+    """
+    Manages text embeddings using Sentence Transformers.
+    Batches chunks through encode() so ingestion cost scales with the
+    number of batches rather than the number of chunks.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBED_MODEL,
+        cache: Optional[EmbeddingCache] = None,
+        runtime: str = EMBED_RUNTIME,
+        quantize: bool = ONNX_QUANTIZE,
+        threads: int = EMBED_THREADS
+    ):
+        """
+        Initialize the embedding model.
+
+        Args:
+            model_name: Sentence Transformers model id
+            cache: Optional persistent embedding cache
+            runtime: torch | onnx (onnxruntime on CPU)
+            quantize: onnx only; use int8 dynamically quantized weights
+            threads: Intra-op threads for the forward pass (0 = runtime default)
+        """
+        if runtime not in ('torch', 'onnx'):
+            raise ValueError(f'Unknown embedding runtime: {runtime}')
+        self.model_name = model_name
+        self.runtime = runtime
+        # int8 vectors differ slightly from float ones, so they get their own cache keys
+        self.cache_namespace = f'{model_name}:onnx-int8' if runtime == 'onnx' and quantize else model_name
+        self.cache = cache
+        try:
+            if runtime == 'onnx':
+                from onnx_embeddings import load_onnx_encoder
+                self.model = load_onnx_encoder(model_name, ONNX_MODEL_DIR, quantize, threads)
+            else:
+                # Deferred: importing sentence_transformers pulls in torch (seconds)
+                from sentence_transformers import SentenceTransformer
+                if threads > 0:
+                    import torch
+                    torch.set_num_threads(threads)
+                self.model = SentenceTransformer(model_name)
+            self.embedding_dim = self.model.get_sentence_embedding_dimension()
+            logger.info(f"✅ Loaded model: {model_name} ({self.embedding_dim}D, {runtime})")
+        except Exception as e:
+            logger.error(f"Failed to load embedding model: {e}")
+            raise
+
+    def embed_text(self, texts: Union[str, List[str]], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+        """
+        Generate embeddings for text(s).
+
+        Args:
+            texts: Single string or list of strings
+            batch_size: Number of texts per forward pass
+
+        Returns:
+            Numpy array of embeddings (shape: [n, embedding_dim])
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+
+        embeddings = np.zeros((len(texts), self.embedding_dim), dtype=np.float32)
+        # Blank chunks keep the historical zero vector instead of a forward pass
+        keep = [i for i, t in enumerate(texts) if t.strip()]
+        if not keep:
+            return embeddings
+        if self.cache is None:
+            embeddings[keep] = self._encode([texts[i] for i in keep], batch_size)
+            return embeddings
+
+        keys = {i: EmbeddingCache.key(self.cache_namespace, texts[i]) for i in keep}
+        cached = self.cache.get_many(list(keys.values()))
+        missing = list(dict.fromkeys(texts[i] for i in keep if keys[i] not in cached))
+        if missing:
+            fresh = self._encode(missing, batch_size)
+            computed = {EmbeddingCache.key(self.cache_namespace, t): v for t, v in zip(missing, fresh)}
+            self.cache.put_many(computed)
+            cached.update(computed)
+        for i in keep:
+            embeddings[i] = cached[keys[i]]
+        return embeddings
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+    def embed_batches(
+        self,
+        texts: List[str],
+        batch_size: int = EMBED_BATCH_SIZE,
+        workers: int = EMBED_WORKERS
+    ) -> np.ndarray:
+        """
+        Embed a large list of chunks in fixed-size batches.
+
+        Args:
+            texts: Chunks to embed
+            batch_size: Chunks per encode() call
+            workers: Thread pool size; 1 encodes batches sequentially
+
+        Returns:
+            Numpy array of embeddings in input order (shape: [n, embedding_dim])
+        """
+        if not texts:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        if workers <= 1 or len(batches) == 1:
+            parts = [self.embed_text(b, batch_size) for b in batches]
+        else:
+            # torch releases the GIL inside encode(), so threads overlap the
+            # tokenization of one batch with the forward pass of another
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(lambda b: self.embed_text(b, batch_size), batches))
+        return np.vstack(parts)
+
+    def get_embedding_dimension(self) -> int:
+        """Return the dimension of embeddings produced by this model"""
+        return self.embedding_dim
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_embedder() -> EmbeddingManager:
+    global _manager
+    if _manager is None:
+        # The startup warmup thread and early requests may race to load the model
+        with _manager_lock:
+            if _manager is None:
+                print('🔄 Loading embeddings...')
+                cache = EmbeddingCache(EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES) if EMBED_CACHE_ENABLED else None
+                _manager = EmbeddingManager(cache=cache)
+                print(' Embeddings ready')
+    return _manager
+
+def preload_model() -> EmbeddingManager:
+    """
+    Load the model without its cache, for a server master process that
+    forks workers afterwards: the weights are then shared copy-on-write,
+    while sqlite connections must not cross a fork (see attach_cache).
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            print('🔄 Preloading embeddings...')
+            _manager = EmbeddingManager(cache=None)
+    return _manager
+
+def attach_cache() -> None:
+    """Open this process's embedding cache for a preloaded model (call after fork)"""
+    if _manager is not None and _manager.cache is None and EMBED_CACHE_ENABLED:
+        _manager.cache = EmbeddingCache(EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES)
+
+def is_loaded() -> bool:
+    return _manager is not None
+
+def cache_stats():
+    # Does not force a model load just to report counters
+    if _manager is None or _manager.cache is None:
+        return None
+    return _manager.cache.stats()
 
 def embed(text):
-    if not text.strip(): return np.zeros(384)
-    return model.encode(text)
+    return get_embedder().embed_text(text)[0]
 
 embedder = embed
@@ -0,0 +1,86 @@
+"""
+Local stand-in for the Groq / OpenAI chat-completions API.
+
+Serves POST /v1/chat/completions in both plain and streaming (SSE) form so
+the query path can be exercised without network access or an API key:
+
+    python fake_llm_server.py --port 9000
+    LLM_BASE_URL=http://127.0.0.1:9000/v1 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+def create_app(first_token_ms: float = 200.0, token_ms: float = 20.0, tokens: int = 40) -> FastAPI:
+    """
+    Build a fake completions app.
+
+    Args:
+        first_token_ms: Delay before the first token (prompt processing)
+        token_ms: Delay between subsequent tokens
+        tokens: Number of tokens in every answer
+    """
+    app = FastAPI(title='Fake LLM')
+
+    def answer_tokens(messages):
+        question = messages[-1]['content'][-60:].replace('\n', ' ') if messages else ''
+        words = f'Fake answer for: {question}'.split()
+        return [(words[i % len(words)] if words else 'token') + ' ' for i in range(tokens)]
+
+    @app.post('/v1/chat/completions')
+    async def completions(request: Request):
+        body = await request.json()
+        model = body.get('model', 'fake')
+        parts = answer_tokens(body.get('messages', []))
+        created = int(time.time())
+
+        if not body.get('stream'):
+            await asyncio.sleep((first_token_ms + token_ms * (len(parts) - 1)) / 1000)
+            return {
+                'id': 'fake-completion',
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': ''.join(parts)},
+                    'finish_reason': 'stop'
+                }],
+            }
+
+        async def events():
+            await asyncio.sleep(first_token_ms / 1000)
+            for i, part in enumerate(parts):
+                if i:
+                    await asyncio.sleep(token_ms / 1000)
+                chunk = {
+                    'id': 'fake-completion',
+                    'object': 'chat.completion.chunk',
+                    'created': created,
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': part}, 'finish_reason': None}],
+                }
+                yield f'data: {json.dumps(chunk)}\n\n'
+            yield 'data: [DONE]\n\n'
+
+        return StreamingResponse(events(), media_type='text/event-stream')
+
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake OpenAI-compatible LLM server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--first-token-ms', type=float, default=200.0)
+    parser.add_argument('--token-ms', type=float, default=20.0)
+    parser.add_argument('--tokens', type=int, default=40)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.first_token_ms, args.token_ms, args.tokens), host=args.host, port=args.port, log_level='warning')
@@ -0,0 +1,37 @@
+"""
+Multi-worker serving: WEB_WORKERS=4 gunicorn -c gunicorn.conf.py main:app
+
+The app is imported and its models and indexes loaded once in the master
+(preload_app), then forked: model weights and the mapped vector index are
+shared copy-on-write instead of loaded once per worker. Workers keep the
+index in sync through the generation file (see index_sync.py).
+"""
+
+import gc
+
+from config import WEB_WORKERS, PORT, VECTOR_BACKEND
+
+if WEB_WORKERS > 1 and VECTOR_BACKEND != 'numpy':
+    # The embedded Chroma client is single-process (its SQLite and HNSW files
+    # are not safe to open from several workers)
+    raise SystemExit('WEB_WORKERS > 1 requires VECTOR_BACKEND=numpy')
+
+bind = f'0.0.0.0:{PORT}'
+workers = WEB_WORKERS
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+timeout = 300  # bulk uploads hold a worker for a while
+graceful_timeout = 30
+
+
+def when_ready(server):
+    import main
+    main.preload()
+    # Objects created so far are never collected: the collector then does not
+    # touch (and un-share) their pages in the workers
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import main
+    main.after_fork()
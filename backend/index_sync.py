@@ -0,0 +1,174 @@
+"""
+Write coordination for indexes shared by several worker processes.
+
+Every worker maps the same persisted indexes (numpy snapshot, BM25,
+date index, dedup signatures, document registry) and serves reads from
+its own copy. Writes are serialized across processes with an exclusive
+file lock; a writer first catches up with the latest persisted state,
+applies its change, persists, and bumps an integer generation stored
+next to the lock. Other workers notice the new generation (polled in
+the background) and reload, so an upload to one worker becomes visible
+to all of them.
+
+fcntl is POSIX-only, like gunicorn itself; elsewhere the lock only
+serializes threads of the current process, which is all a single
+process needs.
+"""
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process serving only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class IndexGeneration:
+    """
+    Cross-process write lock plus a generation counter file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Generation file; the lock file is path + '.lock'
+        """
+        self.path = path
+        self.lock_path = f'{path}.lock'
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One writer per process at a time (flock alone would also do on POSIX)
+        self._thread_lock = threading.Lock()
+        self._lock_file = None
+        self._held = None
+        self._stamp = None
+        self._value = 0
+
+    def current(self) -> int:
+        """Latest published generation (0 before the first write)"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        # Only re-read the file when it was replaced
+        stamp = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+        if stamp != self._stamp:
+            with open(self.path, encoding='utf-8') as f:
+                self._value = int(f.read().strip() or 0)
+            self._stamp = stamp
+        return self._value
+
+    def _publish(self, generation: int) -> None:
+        tmp = f'{self.path}.tmp.{os.getpid()}'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(str(generation))
+        os.replace(tmp, self.path)
+
+    def acquire(self) -> int:
+        """
+        Take the exclusive write lock (blocks while another writer or a reload holds it).
+
+        Returns:
+            The generation current when the lock was taken
+        """
+        self._thread_lock.acquire()
+        try:
+            self._lock_file = open(self.lock_path, 'a')
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._held = self.current()
+        except BaseException:
+            self._close()
+            raise
+        return self._held
+
+    def bump(self) -> int:
+        """Publish a new generation while keeping the lock (progress of a long write)"""
+        self._held += 1
+        self._publish(self._held)
+        return self._held
+
+    def release(self) -> int:
+        """
+        Publish the next generation and drop the lock. Called even when the
+        write failed: other workers then reload whatever reached the disk.
+
+        Returns:
+            The published generation
+        """
+        try:
+            return self.bump()
+        finally:
+            self._close()
+
+    def _close(self) -> None:
+        if self._lock_file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+        self._held = None
+        self._thread_lock.release()
+
+    @contextmanager
+    def reading(self) -> Iterator[int]:
+        """
+        Shared lock for loading the persisted indexes without seeing a write
+        half-way (must not be taken by a thread that holds the write lock).
+
+        Yields:
+            The generation being loaded
+        """
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+            try:
+                yield self.current()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class GenerationWatcher:
+    """
+    Background thread calling reload() whenever the generation moves.
+    """
+
+    def __init__(self, generation: IndexGeneration, seen: Callable[[], int], reload: Callable[[], None], interval: float = 1.0):
+        """
+        Args:
+            generation: Shared generation counter
+            seen: Returns the generation this process has loaded
+            reload: Brings this process up to date (must update seen())
+            interval: Seconds between checks
+        """
+        self.generation = generation
+        self.seen = seen
+        self.reload = reload
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='index-watcher', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if self.generation.current() != self.seen():
+                    self.reload()
+            except Exception as e:
+                logger.error(f"Index reload failed: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
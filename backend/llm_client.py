@@ -0,0 +1,102 @@
+"""
+Async client for OpenAI-compatible chat completion APIs (Groq by default).
+
+Uses one pooled httpx.AsyncClient so completions never block the event
+loop and connections are reused across requests. Point LLM_BASE_URL at
+fake_llm_server.py to exercise it locally without a Groq key.
+"""
+
+import json
+import logging
+from typing import AsyncIterator, Dict, List
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    """Raised when the upstream LLM returns an error or malformed payload"""
+
+
+class AsyncLLMClient:
+    """
+    Pooled async chat-completions client with SSE token streaming.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = 'https://api.groq.com/openai/v1',
+        timeout: float = 30.0,
+        max_connections: int = 20
+    ):
+        """
+        Args:
+            api_key: Bearer token sent with every request
+            base_url: API root, e.g. https://api.groq.com/openai/v1
+            timeout: Per-request timeout in seconds
+            max_connections: Connection pool size
+        """
+        self.base_url = base_url.rstrip('/')
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={'Authorization': f'Bearer {api_key or ""}'},
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        logger.info(f"✅ LLM client ready ({self.base_url})")
+
+    async def complete(self, messages: List[Dict], model: str, **params) -> str:
+        """
+        Run a non-streaming chat completion.
+
+        Args:
+            messages: Chat messages in OpenAI format
+            model: Model id
+            **params: Extra request fields (temperature, max_tokens, ...)
+
+        Returns:
+            The assistant message content
+        """
+        payload = {'model': model, 'messages': messages, **params}
+        try:
+            response = await self._client.post('/chat/completions', json=payload)
+            response.raise_for_status()
+            return response.json()['choices'][0]['message']['content']
+        except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+            logger.error(f"LLM completion failed: {e}")
+            raise LLMError(str(e)) from e
+
+    async def stream(self, messages: List[Dict], model: str, **params) -> AsyncIterator[str]:
+        """
+        Run a streaming chat completion.
+
+        Args:
+            messages: Chat messages in OpenAI format
+            model: Model id
+            **params: Extra request fields
+
+        Yields:
+            Content deltas as they arrive
+        """
+        payload = {'model': model, 'messages': messages, 'stream': True, **params}
+        try:
+            async with self._client.stream('POST', '/chat/completions', json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        break
+                    delta = json.loads(data)['choices'][0].get('delta', {})
+                    if delta.get('content'):
+                        yield delta['content']
+        except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+            logger.error(f"LLM stream failed: {e}")
+            raise LLMError(str(e)) from e
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        await self._client.aclose()
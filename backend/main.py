@@ -1,15 +1,99 @@
 ﻿import os
 from dotenv import load_dotenv
 load_dotenv()
-os.environ['GROQ_API_KEY'] = "your api key here"  
-from fastapi import FastAPI, UploadFile, File, Form
+os.environ.setdefault('GROQ_API_KEY', "your api key here")
+import asyncio
+import json
+import threading
+import time
+import traceback
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from typing import List, Optional
+from fastapi import Depends, FastAPI, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import uvicorn
-import numpy as np
-from sentence_transformers import SentenceTransformer
-import chromadb
+from config import (
+    GROQ_API_KEY, STORE_BATCH_SIZE, QUERY_EMBED_CACHE_SIZE, ANSWER_CACHE_SIZE,
+    LLM_BASE_URL, LLM_TIMEOUT, LLM_MAX_CONNECTIONS,
+    UPLOAD_STREAMING, UPLOAD_BLOCK_SIZE, STREAM_COMMIT_SIZE,
+    CHROMA_PATH, COLLECTION_NAME, SNAPSHOT_PATH, VECTOR_BACKEND, NUMPY_INDEX_PATH,
+    NUMPY_PRECISION, RESCORE_FACTOR,
+    BM25_PATH, RETRIEVAL_MODE, HYBRID_CANDIDATES, CONTEXT_TOKEN_BUDGET,
+    RERANK_MODEL, RERANK_CANDIDATES, RERANK_BUDGET_MS, RERANK_BATCH_SIZE, RERANK_CACHE_SIZE,
+    CHUNK_SIZE, CHUNK_STRATEGY, CHUNK_TOKENS, CHUNK_OVERLAP,
+    WARMUP_ON_STARTUP, QUERY_BATCH_SIZE, QUERY_BATCH_WAIT_MS, METRICS_ENABLED,
+    BATCH_QUERY_MAX, BATCH_QUERY_CONCURRENCY,
+    EMBED_RUNTIME, EMBED_THREADS, WEB_WORKERS, PORT, INDEX_GENERATION_PATH, INDEX_SYNC_INTERVAL,
+    AUDIT_SINK, SUPABASE_URL, SUPABASE_KEY, AUDIT_JSONL_PATH, AUDIT_SPILL_PATH,
+    AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL, AUDIT_MAX_RETRIES,
+    DEDUP_MODE, DEDUP_THRESHOLD, DEDUP_PATH,
+    DATE_INDEX_PATH, TIMELINE_CANDIDATES, TIMELINE_CACHE_SIZE, DOCUMENT_REGISTRY_PATH, INDEX_COMPACT_RATIO,
+)
+# Heavy libraries (torch via sentence_transformers, chromadb) are imported
+# lazily inside the getters below, so importing this module stays fast
+from embeddings import get_embedder, embed, preload_model, attach_cache, is_loaded as embeddings_loaded, cache_stats as embedding_cache_stats
+from query_cache import QueryCache
+from micro_batcher import MicroBatcher
+from llm_client import AsyncLLMClient, LLMError
+from metrics import MetricsRegistry, process_memory
+from supabase_client import create_audit_logger
+from chunker import make_chunker, chunk_text, aiter_decoded, ChunkReport
+from context_builder import ContextBuilder
+import snapshot
+from vector_store import create_store, match_where
+from chunk_metadata import build_metadatas, build_where
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from dedup import NearDuplicateIndex
+from timeline_generator import DateIndex, TimelineGenerator
+from document_registry import DocumentRegistry
+from index_sync import IndexGeneration, GenerationWatcher
+
+# Warmup progress reported by /ready: pending | done | failed | skipped
+readiness = {'warmup': 'pending', 'error': None}
+
+def warmup():
+    try:
+        embed('warmup')  # first forward pass also initializes torch kernels
+        if loaded_generation is None:
+            reload_indexes()
+        if get_reranker() is not None:
+            get_reranker().calibrate()  # per worker: preload() only loads the weights
+        readiness['warmup'] = 'done'
+        print('✅ Warmup complete')
+    except Exception as e:
+        # Requests load what is missing lazily; /ready follows what actually loaded
+        readiness.update(warmup='failed', error=str(e))
+        print(f'❌ Warmup failed: {e}')
+        traceback.print_exc()
 
-app = FastAPI(title=' ArchaeoMind')
+@asynccontextmanager
+async def lifespan(app):
+    global audit
+    if WARMUP_ON_STARTUP:
+        # Background thread: the server accepts /health immediately while models load
+        threading.Thread(target=warmup, name='warmup', daemon=True).start()
+    else:
+        readiness['warmup'] = 'skipped'  # models and indexes load on first use
+    audit = create_audit_logger(
+        AUDIT_SINK, SUPABASE_URL, SUPABASE_KEY, AUDIT_JSONL_PATH,
+        max_queue=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL,
+        max_retries=AUDIT_MAX_RETRIES, spill_path=AUDIT_SPILL_PATH,
+    )
+    if audit is not None:
+        await audit.start()
+    if INDEX_SYNC_INTERVAL > 0:
+        index_watcher.start()
+    yield
+    index_watcher.stop()
+    if audit is not None:
+        await audit.close()  # flush queued audit rows before exit
+    await question_batcher.aclose()
+    if client_llm is not None:
+        await client_llm.aclose()
+
+app = FastAPI(title=' ArchaeoMind', lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,75 +104,780 @@ app.add_middleware(
 )
 
 # LAZY LOAD EVERYTHING
-model = None
-collection = None
-client_groq = None
-
-def get_model():
-    global model
-    if model is None:
-        print(' Loading embeddings...')
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        print(' Embeddings ready')
-    return model
+store = None
+lexical = None
+dedup = None
+dates = None
+registry = None
+reranker = None
+timeline = None
+chunk_reports = {}
+client_llm = None
+audit = None  # batched audit logger, created in lifespan when AUDIT_SINK is set
+query_cache = QueryCache(QUERY_EMBED_CACHE_SIZE, ANSWER_CACHE_SIZE)
+
+# Workers share the persisted indexes: writes take a file lock, append to the
+# index logs and bump the generation, and every process catches up on the logs
+# when it sees a generation it has not loaded
+index_generation = IndexGeneration(INDEX_GENERATION_PATH)
+loaded_generation = None
+index_watcher = GenerationWatcher(index_generation, lambda: loaded_generation, lambda: refresh_indexes(), INDEX_SYNC_INTERVAL)
+# Concurrent questions share one batched forward pass
+question_batcher = MicroBatcher(lambda texts: get_embedder().embed_text(texts), QUERY_BATCH_SIZE, QUERY_BATCH_WAIT_MS)
+
+RETRIEVAL_MODES = ('dense', 'hybrid')
+QUERY_MODEL = 'llama-3.1-8b-instant'  #  CORRECT MODEL ID
+QUERY_TEMPLATE = 'Docs:\n{context}\n\nQ: {question}\n\nAnswer concisely with sources.'
+_init_lock = threading.RLock()
+
+metrics = MetricsRegistry(METRICS_ENABLED)
+metrics.describe('chunks_ingested_total', 'counter', 'Chunks written to the vector store')
+metrics.describe('upstream_errors_total', 'counter', 'Failed calls to upstream services')
+metrics.describe('duplicates_skipped_total', 'counter', 'Near-duplicate chunks not embedded or stored')
+metrics.describe('context_tokens_saved_total', 'counter', 'Prompt tokens saved by merging overlapping chunks')
+metrics.describe('rerank_fallbacks_total', 'counter', 'Reranks abandoned for vector order after the time budget')
+
+# Merges overlapping retrieved chunks and packs them into the prompt token budget
+context_builder = ContextBuilder(CONTEXT_TOKEN_BUDGET)
+
+def cache_hits():
+    hits = [({'cache': 'question_embedding'}, query_cache.embeddings.hits), ({'cache': 'answer'}, query_cache.answers.hits)]
+    chunk_stats = embedding_cache_stats()
+    if chunk_stats:
+        hits.append(({'cache': 'chunk_embedding'}, chunk_stats['hits']))
+    return hits
+
+metrics.register_callback('cache_hits_total', 'counter', 'Cache hits by cache', cache_hits)
+metrics.register_callback('index_chunks', 'gauge', 'Chunks in the vector store',
+                          lambda: [({}, store.count())] if store is not None else [])
+metrics.register_callback('process_resident_memory_bytes', 'gauge', 'Resident memory of this process', process_memory)
+
+# The load_* functions build an index without publishing it, so a reload can
+# prepare every replacement before swapping them in (see reload_indexes)
+
+def fresh_volume():
+    # No index was ever persisted here, as opposed to a store emptied by deleting
+    # every document (which must stay empty). The store's own path is no
+    # signal: Chroma creates its directory on open
+    paths = (BM25_PATH, DATE_INDEX_PATH, DOCUMENT_REGISTRY_PATH)
+    return not any(os.path.exists(path) or os.path.exists(f'{path}.log') for path in paths)
+
+def load_db():
+    print(f' Loading vector store ({VECTOR_BACKEND})...')
+    db = create_store(
+        VECTOR_BACKEND,
+        chroma_path=CHROMA_PATH,
+        collection_name=COLLECTION_NAME,
+        batch_size=STORE_BATCH_SIZE,
+        numpy_path=NUMPY_INDEX_PATH,
+        precision=NUMPY_PRECISION,
+        rescore_factor=RESCORE_FACTOR,
+        compact_ratio=INDEX_COMPACT_RATIO,
+    )
+    # Fresh volume: reload the last snapshot instead of re-embedding the corpus.
+    # The other indexes then rebuild from the store and the registry adopts its chunks
+    if db.count() == 0 and fresh_volume() and snapshot.snapshot_exists(SNAPSHOT_PATH):
+        db.restore_snapshot(snapshot.load_snapshot(SNAPSHOT_PATH))
+        db.persist()
+    print(f'✅ Vector store ready ({db.count()} chunks)')
+    return db
+
+def load_lexical(db):
+    index = BM25Index(BM25_PATH, compact_ratio=INDEX_COMPACT_RATIO)
+    # Index predates BM25 (or the file was lost): rebuild from stored chunks
+    if len(index) == 0 and db.count() > 0:
+        for ids, documents, _ in db.iter_chunks(STORE_BATCH_SIZE):
+            index.add(ids, documents)
+        index.save()
+    print(f'✅ BM25 index ready ({len(index)} chunks)')
+    return index
+
+def load_dedup(db):
+    if DEDUP_MODE == 'off':
+        return None
+    index = NearDuplicateIndex(DEDUP_PATH, DEDUP_THRESHOLD, compact_ratio=INDEX_COMPACT_RATIO)
+    # Signatures for chunks stored before dedup was enabled
+    if len(index) == 0 and db.count() > 0:
+        for ids, documents, _ in db.iter_chunks(STORE_BATCH_SIZE):
+            for chunk_id, document in zip(ids, documents):
+                index.add(chunk_id, document)
+        index.save()
+    print(f'✅ Dedup index ready ({len(index)} chunks)')
+    return index
+
+def load_dates(db):
+    index = DateIndex(DATE_INDEX_PATH, INDEX_COMPACT_RATIO)
+    # Dates for chunks stored before the index existed
+    if not os.path.exists(DATE_INDEX_PATH) and db.count() > 0:
+        for ids, documents, _ in db.iter_chunks(STORE_BATCH_SIZE):
+            index.add(ids, documents)
+        index.save()
+    print(f'✅ Date index ready ({len(index)} events)')
+    return index
+
+def load_registry(db):
+    index = DocumentRegistry(DOCUMENT_REGISTRY_PATH, INDEX_COMPACT_RATIO)
+    # Adopt documents stored before the registry so they can be diffed and deleted
+    if not os.path.exists(DOCUMENT_REGISTRY_PATH) and db.count() > 0:
+        for ids, documents, metadatas in db.iter_chunks(STORE_BATCH_SIZE):
+            for chunk_id, document, meta in zip(ids, documents, metadatas):
+                index.track((meta or {}).get('source') or chunk_id.rsplit('_', 1)[0], chunk_id, document)
+        index.save()
+    print(f'✅ Document registry ready ({len(index)} documents)')
+    return index
 
 def get_db():
-    global collection
-    if collection is None:
-        print(' Loading ChromaDB...')
-        client = chromadb.Client()
-        collection = client.create_collection('docs')
-        print('✅ ChromaDB ready')
-    return collection
-
-def get_groq():
-    global client_groq
-    if client_groq is None:
+    global store
+    if store is not None:
+        return store
+    with _init_lock:
+        if store is None:
+            store = load_db()  # publish only once fully loaded
+    return store
+
+def get_lexical():
+    global lexical
+    if lexical is not None:
+        return lexical
+    with _init_lock:
+        if lexical is None:
+            lexical = load_lexical(get_db())
+    return lexical
+
+def get_dedup():
+    global dedup
+    if dedup is not None or DEDUP_MODE == 'off':
+        return dedup
+    with _init_lock:
+        if dedup is None:
+            dedup = load_dedup(get_db())
+    return dedup
+
+def get_dates():
+    global dates
+    if dates is not None:
+        return dates
+    with _init_lock:
+        if dates is None:
+            dates = load_dates(get_db())
+    return dates
+
+def get_registry():
+    global registry
+    if registry is not None:
+        return registry
+    with _init_lock:
+        if registry is None:
+            registry = load_registry(get_db())
+    return registry
+
+def topic_relevance(topic):
+    return dict(get_lexical().search(topic, TIMELINE_CANDIDATES))
+
+def get_timeline():
+    global timeline
+    if timeline is None:
+        timeline = TimelineGenerator(get_dates(), topic_relevance, TIMELINE_CACHE_SIZE)
+    return timeline
+
+def persist_indexes(compact=None):
+    # Appends each index's changes to its log; compact=True rewrites every index
+    get_db().persist(compact)
+    get_lexical().save(compact=compact)
+    get_dates().save(compact=compact)
+    get_registry().save(compact=compact)
+    if get_dedup() is not None:
+        get_dedup().save(compact=compact)
+
+def get_reranker():
+    global reranker
+    if reranker is not None or not RERANK_MODEL:
+        return reranker
+    with _init_lock:
+        if reranker is None:
+            print(f'🔄 Loading reranker ({RERANK_MODEL})...')
+            from reranker import CrossEncoderReranker  # imports sentence_transformers
+            reranker = CrossEncoderReranker(RERANK_MODEL, RERANK_BATCH_SIZE, RERANK_BUDGET_MS, RERANK_CACHE_SIZE)
+            print('✅ Reranker ready')
+    return reranker
+
+def reload_indexes(locked=False):
+    # Load what is on disk next to this process's copies, then swap them all in
+    # at once: requests keep the old set meanwhile and never see a missing or
+    # mixed one. The shared lock keeps another worker's write from being seen half-way
+    global store, lexical, dedup, dates, registry, timeline, loaded_generation
+    with (nullcontext(index_generation.current()) if locked else index_generation.reading()) as generation:
+        db = load_db()
+        loaded = (db, load_lexical(db), load_dedup(db), load_dates(db), load_registry(db))
+        with _init_lock:
+            store, lexical, dedup, dates, registry, timeline, loaded_generation = *loaded, None, generation
+    query_cache.bump_version()
+
+def _refreshed(index, load, db):
+    # The index with other workers' logged changes applied, or a fresh load
+    # when its files were compacted since (or it was never loaded)
+    return index if index is not None and index.refresh() else load(db)
+
+def refresh_indexes(locked=False):
+    # Catch up on the changes other workers logged since our last load; like
+    # reload_indexes, replacements are loaded first and swapped in together
+    global store, lexical, dedup, dates, registry, timeline, loaded_generation
+    with (nullcontext(index_generation.current()) if locked else index_generation.reading()) as generation:
+        db = store if store is not None and store.refresh() else load_db()
+        loaded = (
+            db,
+            _refreshed(lexical, load_lexical, db),
+            _refreshed(dedup, load_dedup, db) if DEDUP_MODE != 'off' else None,
+            _refreshed(dates, load_dates, db),
+            _refreshed(registry, load_registry, db),
+        )
+        with _init_lock:
+            # The timeline generator holds the date index it was built on
+            kept = timeline if loaded[3] is dates else None
+            store, lexical, dedup, dates, registry, timeline, loaded_generation = *loaded, kept, generation
+    query_cache.bump_version()
+
+def begin_write():
+    # Cross-worker write lock; catch up first so stale indexes are never persisted
+    generation = index_generation.acquire()
+    try:
+        if generation != loaded_generation:
+            refresh_indexes(locked=True)
+    except BaseException:
+        index_generation.release()
+        raise
+
+def end_write(ok, compact=None):
+    global loaded_generation
+    try:
+        if ok:
+            persist_indexes(compact)
+    finally:
+        published = index_generation.release()
+    if ok:
+        loaded_generation = published  # our own write: nothing to reload
+
+@contextmanager
+def index_write(compact=None):
+    # compact: see persist_indexes (bulk import appends per commit, compacts once at the end)
+    begin_write()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        end_write(ok, compact)
+
+def preload():
+    # gunicorn master, before fork: model weights and the mapped index are then
+    # shared copy-on-write by every worker. No forward pass runs here; thread
+    # pools created before a fork are not safe to use in the children
+    if EMBED_RUNTIME == 'torch':
+        preload_model()
+    get_reranker()
+    if VECTOR_BACKEND == 'numpy':
+        reload_indexes()
+
+def after_fork():
+    attach_cache()
+    if EMBED_RUNTIME == 'torch' and EMBED_THREADS == 0 and WEB_WORKERS > 1:
+        import torch
+        # Split the cores between workers instead of every worker using all of them
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // WEB_WORKERS))
+
+def get_llm():
+    global client_llm
+    if client_llm is None:
         print('🔄 Loading Groq...')
-        from groq import Groq
-        client_groq = Groq()
+        client_llm = AsyncLLMClient(GROQ_API_KEY, LLM_BASE_URL, LLM_TIMEOUT, LLM_MAX_CONNECTIONS)
         print('✅ Groq ready')
-    return client_groq
-
-def embed(text):
-    return get_model().encode(text) if text.strip() else np.zeros(384)
-
-def ingest(text, filename):
-    coll = get_db()
-    chunks = [text[i:i+800] for i in range(0, len(text), 400)]
-    embeddings = [embed(c) for c in chunks]
-    ids = [f'{filename}_{i}' for i in range(len(chunks))]
-    coll.add(embeddings=[e.tolist() for e in embeddings], documents=chunks, ids=ids)
-    return {'chunks': len(chunks)}
-
-def query(question):
-    coll = get_db()
-    client = get_groq()
-    q_emb = embed(question)
-    results = coll.query(query_embeddings=[q_emb.tolist()], n_results=3)
-    chunks = results['documents'][0] if results['documents'] else []
-    context = '\n'.join(chunks)
-    response = client.chat.completions.create(
-        model='llama-3.1-8b-instant',  #  CORRECT MODEL ID
-        messages=[{'role': 'user', 'content': f'Docs:\n{context}\n\nQ: {question}\n\nAnswer concisely with sources.'}]
-    )
-    return {'answer': response.choices[0].message.content, 'sources': chunks}
+    return client_llm
+
+def chunk_ids(filename, first_index, count):
+    return [f'{filename}_{i}' for i in range(first_index, first_index + count)]
+
+def drop_duplicates(ids, chunks, exclude=()):
+    # Returns positions of the chunks worth embedding and {dropped id: canonical id}
+    index = get_dedup()
+    if index is None:
+        return list(range(len(chunks))), {}
+    keep, duplicates = index.filter(ids, chunks, link=DEDUP_MODE == 'link', exclude=exclude)
+    metrics.inc('duplicates_skipped_total', len(duplicates))
+    return keep, duplicates
+
+def index_chunks(chunks, embeddings, filename, first_index=0, ids=None, metadatas=None):
+    ids = ids or chunk_ids(filename, first_index, len(chunks))
+    metadatas = metadatas or build_metadatas(chunks, filename, first_index)
+    with metrics.time('store_write'):
+        get_db().add(ids, embeddings, chunks, metadatas)
+        get_lexical().add(ids, chunks)
+        get_dates().add(ids, chunks)
+    query_cache.bump_version()
+    metrics.inc('chunks_ingested_total', len(chunks))
+
+def remove_chunks(ids):
+    if not ids:
+        return
+    # Chunks of other documents skipped as near-duplicates of these would vanish with them
+    found = get_db().get(ids)
+    texts = dict(zip(found['ids'], found['documents']))
+    heirs = [(texts[chunk_id], heir) for chunk_id in texts if (heir := get_registry().reassign(chunk_id))]
+    with metrics.time('store_write'):
+        get_db().delete(ids)
+        get_lexical().remove(ids)
+        get_dates().remove(ids)
+        if get_dedup() is not None:
+            get_dedup().remove(ids)
+    query_cache.bump_version()
+    if heirs:
+        promote_duplicates(heirs)
+
+def promote_duplicates(heirs):
+    # Store a removed chunk's text under the id of its first duplicate, which takes
+    # its place; the near-duplicate text stands in for the skipped original
+    chunks = [text for text, _ in heirs]
+    ids = [heir_id for _, (_, heir_id, _, _) in heirs]
+    metadatas = [build_metadatas([text], source, position)[0] for text, (source, _, position, _) in heirs]
+    with metrics.time('embed'):
+        vectors = get_embedder().embed_batches(chunks)
+    index_chunks(chunks, vectors, None, ids=ids, metadatas=metadatas)
+    if get_dedup() is not None:
+        for chunk_id, text in zip(ids, chunks):
+            get_dedup().add(chunk_id, text)
+        if DEDUP_MODE == 'link':
+            get_dedup().link({other: heir_id for _, (_, heir_id, _, others) in heirs for _, other in others})
+
+def refresh_positions(ids, metadatas):
+    # Unchanged chunks may have moved within the document: update position metadata only.
+    # Returns the ids the store does not hold (lost index, backend switch)
+    found = get_db().get(ids)
+    by_id = dict(zip(ids, metadatas))
+    moved, moved_metadatas = [], []
+    for chunk_id, old in zip(found['ids'], found['metadatas']):
+        new = by_id[chunk_id]
+        if old is None or any(old.get(k) != new.get(k) for k in ('chunk_index', 'offset')):
+            moved.append(chunk_id)
+            moved_metadatas.append({**new, 'uploaded_at': (old or new)['uploaded_at']})
+    if moved:
+        get_db().update_metadata(moved, moved_metadatas)
+    stored = set(found['ids'])
+    return [chunk_id for chunk_id in ids if chunk_id not in stored]
+
+def store_chunks(update, chunks, first_index=0, offsets=None, embeddings=None, metadatas=None):
+    # Diff against the registered version: only new or edited chunks are embedded
+    ids, fresh = update.assign(chunks)
+    metadatas = metadatas or build_metadatas(chunks, update.source, first_index, offsets)
+    fresh_set = set(fresh)
+    unchanged = [i for i in range(len(chunks)) if i not in fresh_set]
+    if unchanged:
+        missing = set(refresh_positions([ids[i] for i in unchanged], [metadatas[i] for i in unchanged]))
+        if missing:
+            # Registered but not in the store: embed and store them like new chunks
+            lost = [i for i in unchanged if ids[i] in missing]
+            update.mark_missing([ids[i] for i in lost])
+            fresh = sorted(fresh + lost)
+    # The replaced version is about to be deleted, so an edited chunk is not its duplicate
+    kept, duplicates = drop_duplicates([ids[i] for i in fresh], [chunks[i] for i in fresh], exclude=update.previous_ids)
+    keep = [fresh[i] for i in kept]
+    update.mark_duplicates(duplicates)
+    if keep:
+        new_chunks = [chunks[i] for i in keep]
+        if embeddings is None:
+            with metrics.time('embed'):
+                vectors = get_embedder().embed_batches(new_chunks)
+        else:
+            vectors = embeddings[keep]
+        index_chunks(new_chunks, vectors, update.source, ids=[ids[i] for i in keep], metadatas=[metadatas[i] for i in keep])
+    return len(duplicates)
+
+def finish_update(update):
+    # Record the new version first: a removed chunk's place then only goes to
+    # duplicates that are still registered
+    stale = update.stale_ids()
+    counts = update.commit()
+    remove_chunks(stale)
+    return counts
+
+def delete_document(source):
+    with index_write():
+        ids = get_registry().remove(source)
+        remove_chunks(ids)
+        chunk_reports.pop(source, None)
+    return len(ids)
+
+def get_chunker(strategy):
+    return make_chunker(strategy, CHUNK_SIZE, CHUNK_TOKENS, CHUNK_OVERLAP)
+
+def ingest(text, filename, strategy=CHUNK_STRATEGY):
+    with metrics.time('chunk'):
+        pieces = chunk_text(text, get_chunker(strategy))
+    chunks = [c for _, c in pieces]
+    with index_write():
+        update = get_registry().begin(filename)
+        duplicates = store_chunks(update, chunks, offsets=[o for o, _ in pieces])
+        changes = finish_update(update)
+    report = ChunkReport(strategy)
+    report.add(chunks)
+    chunk_reports[filename] = report.as_dict()
+    return {'chunks': len(chunks), 'duplicates': duplicates, **changes, 'report': chunk_reports[filename]}
+
+async def ingest_stream(file, filename, strategy=CHUNK_STRATEGY):
+    # Memory stays at ~one block plus STREAM_COMMIT_SIZE chunks regardless of file size
+    chunker = get_chunker(strategy)
+    report = ChunkReport(strategy)
+    # Holds the write lock for the whole upload; reads stay unblocked
+    await run_in_threadpool(begin_write)
+    ok = False
+    try:
+        result = await _ingest_stream(file, filename, chunker, report)
+        ok = True
+    finally:
+        await run_in_threadpool(end_write, ok)
+    chunk_reports[filename] = report.as_dict()
+    return {**result, 'report': chunk_reports[filename]}
+
+async def _ingest_stream(file, filename, chunker, report):
+    update = get_registry().begin(filename)
+    pending = []  # (offset, chunk) pairs
+    total = duplicates = 0
+
+    async def commit(pieces):
+        nonlocal total, duplicates
+        batch = [c for _, c in pieces]
+        duplicates += await run_in_threadpool(store_chunks, update, batch, total, [o for o, _ in pieces])
+        report.add(batch)
+        total += len(batch)
+
+    async for text in aiter_decoded(file.read, UPLOAD_BLOCK_SIZE):
+        with metrics.time('chunk'):
+            pending.extend(chunker.feed(text))
+        while len(pending) >= STREAM_COMMIT_SIZE:
+            batch, pending = pending[:STREAM_COMMIT_SIZE], pending[STREAM_COMMIT_SIZE:]
+            await commit(batch)
+    pending.extend(chunker.flush())
+    if pending:
+        await commit(pending)
+    changes = await run_in_threadpool(finish_update, update)
+    return {'chunks': total, 'duplicates': duplicates, **changes}
+
+async def embed_question(question):
+    q_emb = query_cache.get_embedding(question)
+    if q_emb is None:
+        with metrics.time('query_embed'):
+            if QUERY_BATCH_SIZE > 1:
+                q_emb = await question_batcher.submit(question)
+            else:
+                q_emb = await run_in_threadpool(embed, question)
+        query_cache.put_embedding(question, q_emb)
+    return q_emb
+
+def embed_questions(questions):
+    # Whole batch in one encode call; cached questions are skipped
+    q_embs = [query_cache.get_embedding(q) for q in questions]
+    missing = [i for i, e in enumerate(q_embs) if e is None]
+    if missing:
+        with metrics.time('query_embed'):
+            vectors = get_embedder().embed_text([questions[i] for i in missing])
+        for i, vector in zip(missing, vectors):
+            query_cache.put_embedding(questions[i], vector)
+            q_embs[i] = vector
+    return q_embs
+
+def candidate_depth(top_k):
+    # Wider first stage when a reranker picks the final top_k
+    return max(top_k, RERANK_CANDIDATES) if RERANK_MODEL else top_k
+
+def rerank(question, hits, top_k):
+    chunks, chunk_ids, metadatas = hits
+    if get_reranker() is None or len(chunk_ids) <= top_k:
+        return hits
+    with metrics.time('rerank'):
+        order, reranked = get_reranker().rerank(question, chunk_ids, chunks, top_k)
+    if not reranked:
+        metrics.inc('rerank_fallbacks_total')
+    return [chunks[i] for i in order], [chunk_ids[i] for i in order], [metadatas[i] for i in order]
+
+def retrieve_many(questions, q_embs, mode=RETRIEVAL_MODE, top_k=3, where=None):
+    with metrics.time('retrieve'):
+        found = search_many(questions, q_embs, mode, candidate_depth(top_k), where)
+    return [rerank(q, hits, top_k) for q, hits in zip(questions, found)]
+
+def retrieve(question, mode=RETRIEVAL_MODE, top_k=3, q_emb=None, where=None):
+    if q_emb is None:
+        q_emb = query_cache.get_embedding(question)
+    if q_emb is None:
+        with metrics.time('query_embed'):
+            q_emb = embed(question)
+        query_cache.put_embedding(question, q_emb)
+    with metrics.time('retrieve'):
+        hits = search(question, q_emb, mode, candidate_depth(top_k), where)
+    return rerank(question, hits, top_k)
+
+def lexical_search(question, where=None):
+    if not where:
+        return [chunk_id for chunk_id, _ in get_lexical().search(question, HYBRID_CANDIDATES)]
+    # BM25 has no metadata: over-fetch, then keep the candidates that match the filter
+    ids = [chunk_id for chunk_id, _ in get_lexical().search(question, HYBRID_CANDIDATES * 4)]
+    found = get_db().get(ids)
+    return [i for i, meta in zip(found['ids'], found['metadatas']) if match_where(meta, where)][:HYBRID_CANDIDATES]
+
+def search(question, q_emb, mode, top_k, where=None):
+    return search_many([question], [q_emb], mode, top_k, where)[0]
+
+def search_many(questions, q_embs, mode, top_k, where=None):
+    # One multi-vector store query for all questions; returns (chunks, ids, metadatas) per question
+    if mode == 'hybrid':
+        # Fuse dense and BM25 rankings so exact site names / ids / dates surface
+        dense = get_db().query(q_embs, n_results=HYBRID_CANDIDATES, where=where)
+        out = []
+        for i, question in enumerate(questions):
+            dense_ids = dense['ids'][i] if dense['ids'] else []
+            lexical_ids = lexical_search(question, where)
+            fused = reciprocal_rank_fusion([dense_ids, lexical_ids])[:top_k]
+            found = get_db().get(fused)
+            out.append((found['documents'], found['ids'], found['metadatas']))
+        return out
+    results = get_db().query(q_embs, n_results=top_k, where=where)
+    if not results['ids']:
+        return [([], [], []) for _ in questions]
+    return list(zip(results['documents'], results['ids'], results['metadatas']))
+
+def build_messages(question, chunks, chunk_ids, metadatas):
+    # Returns the messages and the packed context (its passages are the answer's sources)
+    with metrics.time('prompt_build'):
+        context = context_builder.build(chunks, chunk_ids, metadatas)
+        messages = [{'role': 'user', 'content': QUERY_TEMPLATE.format(context=context.text, question=question)}]
+    metrics.inc('context_tokens_saved_total', context.stats()['tokens_saved'])
+    return messages, context
+
+async def query(question, mode=RETRIEVAL_MODE, where=None):
+    # Embedding + vector search are CPU-bound; keep them off the event loop
+    q_emb = await embed_question(question)
+    chunks, chunk_ids, metadatas = await run_in_threadpool(retrieve, question, mode, 3, q_emb, where)
+    return await answer_question(question, chunks, chunk_ids, metadatas)
+
+async def answer_question(question, chunks, chunk_ids, metadatas):
+    key = query_cache.answer_key(question, chunk_ids, QUERY_MODEL, QUERY_TEMPLATE)
+    cached = query_cache.get_answer(key)
+    if cached is not None:
+        return cached
+    messages, context = build_messages(question, chunks, chunk_ids, metadatas)
+    try:
+        with metrics.time('llm_total'):
+            answer = await get_llm().complete(messages, QUERY_MODEL)
+    except LLMError:
+        metrics.inc('upstream_errors_total', upstream='llm')
+        raise
+    result = {'answer': answer, 'sources': context.sources, 'context': context.stats()}
+    query_cache.put_answer(key, result)
+    return result
+
+async def audited_query(question, mode=RETRIEVAL_MODE, where=None):
+    result = await query(question, mode, where)
+    if audit is not None:
+        audit.log_query(question, result['answer'], len(result['sources']))
+    return result
+
+async def query_batch(questions, mode=RETRIEVAL_MODE, where=None):
+    # One encode call and one store query for the whole batch, then
+    # concurrent completions; results come back in request order
+    unique = list(dict.fromkeys(questions))
+    q_embs = await run_in_threadpool(embed_questions, unique)
+    retrieved = await run_in_threadpool(retrieve_many, unique, q_embs, mode, 3, where)
+    limit = asyncio.Semaphore(BATCH_QUERY_CONCURRENCY)
+
+    async def one(question, hits):
+        async with limit:
+            try:
+                result = await answer_question(question, *hits)
+            except LLMError as e:
+                # One failed completion should not sink the rest of the batch
+                return {'question': question, 'error': str(e)}
+        if audit is not None:
+            audit.log_query(question, result['answer'], len(result['sources']))
+        return {'question': question, **result}
+
+    results = await asyncio.gather(*(one(q, hits) for q, hits in zip(unique, retrieved)))
+    by_question = dict(zip(unique, results))
+    return [by_question[q] for q in questions]
+
+async def query_stream(question, mode=RETRIEVAL_MODE, where=None):
+    q_emb = await embed_question(question)
+    chunks, chunk_ids, metadatas = await run_in_threadpool(retrieve, question, mode, 3, q_emb, where)
+    key = query_cache.answer_key(question, chunk_ids, QUERY_MODEL, QUERY_TEMPLATE)
+    cached = query_cache.get_answer(key)
+    if cached is not None:
+        yield sse('token', {'token': cached['answer']})
+        sources, context_stats = cached['sources'], cached.get('context')
+    else:
+        parts = []
+        messages, context = build_messages(question, chunks, chunk_ids, metadatas)
+        sources, context_stats = context.sources, context.stats()
+        started = time.perf_counter()
+        try:
+            async for token in get_llm().stream(messages, QUERY_MODEL):
+                if not parts:
+                    metrics.observe('llm_ttft', time.perf_counter() - started)
+                parts.append(token)
+                yield sse('token', {'token': token})
+        except Exception as e:
+            metrics.inc('upstream_errors_total', upstream='llm')
+            yield sse('error', {'detail': str(e)})
+            return
+        metrics.observe('llm_total', time.perf_counter() - started)
+        query_cache.put_answer(key, {'answer': ''.join(parts), 'sources': sources, 'context': context_stats})
+    if audit is not None:
+        audit.log_query(question, cached['answer'] if cached else ''.join(parts), len(sources))
+    yield sse('sources', {'sources': sources, 'context': context_stats})
+    yield sse('done', {})
+
+def sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
 
 @app.get('/health')
 def health():
     return {'status': 'LIVE'}
 
-@app.post('/api/upload')
-async def upload(file: UploadFile = File(...)):
-    content = await file.read()
-    text = content.decode('utf-8')
-    result = ingest(text, file.filename or 'doc.txt')
+@app.get('/ready')
+def ready():
+    # Without warmup there is nothing to wait for; otherwise ready once it has
+    # finished (or failed) and the model and store are actually loaded
+    loaded = {'embeddings': embeddings_loaded(), 'store': store is not None}
+    warm = readiness['warmup'] == 'skipped' or (readiness['warmup'] != 'pending' and all(loaded.values()))
+    body = {'status': 'READY' if warm else 'WARMING', **loaded, **readiness}
+    return JSONResponse(body, status_code=200 if warm else 503)
+
+@app.get('/api/cache/stats')
+def cache_stats():
+    return {
+        'query': query_cache.stats(),
+        'embeddings': embedding_cache_stats(),
+        'question_batches': question_batcher.stats(),
+        'audit': audit.stats() if audit is not None else None,
+        'rerank': reranker.stats() if reranker is not None else None,
+    }
+
+@app.get('/metrics')
+def prometheus_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail='Metrics are disabled (METRICS_ENABLED=false)')
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+@app.get('/api/index/stats')
+def index_stats():
+    stats = get_db().stats()
+    if get_dedup() is not None:
+        stats['dedup'] = get_dedup().stats()
+    return stats
+
+@app.post('/api/snapshot')
+async def create_snapshot():
+    count = await run_in_threadpool(get_db().save_snapshot, SNAPSHOT_PATH)
+    return {'status': 'success', 'chunks': count, 'path': SNAPSHOT_PATH}
+
+async def ingest_upload(file, filename, stream, chunker):
+    try:
+        get_chunker(chunker)  # reject unknown strategies before reading the body
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if stream:
+        result = await ingest_stream(file, filename, chunker)
+    else:
+        content = await file.read()
+        text = content.decode('utf-8')
+        result = await run_in_threadpool(ingest, text, filename, chunker)
+    if audit is not None:
+        audit.log_document_upload(filename, filename, round((file.size or 0) / (1 << 20), 3))
     return {'status': 'success', **result}
 
+@app.post('/api/upload')
+async def upload(
+    file: UploadFile = File(...),
+    stream: bool = Form(UPLOAD_STREAMING),
+    chunker: str = Form(CHUNK_STRATEGY)
+):
+    # Re-uploading a known filename updates it in place (changed chunks only)
+    return await ingest_upload(file, file.filename or 'doc.txt', stream, chunker)
+
+@app.get('/api/documents')
+def list_documents():
+    return {'documents': get_registry().documents()}
+
+@app.put('/api/documents/{source:path}')
+async def replace_document(
+    source: str,
+    file: UploadFile = File(...),
+    stream: bool = Form(UPLOAD_STREAMING),
+    chunker: str = Form(CHUNK_STRATEGY)
+):
+    if source not in get_registry():
+        raise HTTPException(status_code=404, detail=f'Unknown document: {source}')
+    return await ingest_upload(file, source, stream, chunker)
+
+@app.delete('/api/documents/{source:path}')
+async def remove_document(source: str):
+    if source not in get_registry():
+        raise HTTPException(status_code=404, detail=f'Unknown document: {source}')
+    removed = await run_in_threadpool(delete_document, source)
+    return {'status': 'success', 'source': source, 'removed': removed}
+
+@app.get('/api/chunks/report')
+def chunk_report():
+    return chunk_reports
+
+@app.post('/api/timeline')
+async def build_timeline(
+    topic: str = Form(''),
+    start: Optional[int] = Form(None),
+    end: Optional[int] = Form(None),
+    limit: int = Form(50)
+):
+    # Years are signed: 2600 BCE is -2600
+    events = await run_in_threadpool(get_timeline().generate, topic, start, end, limit)
+    if audit is not None:
+        audit.log_timeline(topic, events)
+    return {'topic': topic, 'events': events}
+
+def query_filters(
+    source: Optional[str] = Form(None),
+    site: Optional[str] = Form(None),
+    period: Optional[str] = Form(None),
+    year_from: Optional[int] = Form(None),
+    year_to: Optional[int] = Form(None)
+):
+    # Optional metadata filters shared by the query endpoints (years signed, BCE negative)
+    return build_where(source, site, period, year_from, year_to)
+
+def retrieval_mode(mode: str = Form(RETRIEVAL_MODE)):
+    # search_many() treats anything but 'hybrid' as dense, so reject typos here
+    if mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown retrieval mode: {mode} (expected {' or '.join(RETRIEVAL_MODES)})")
+    return mode
+
 @app.post('/api/query')
-async def ask(q: str = Form(...)):
-    result = query(q)
+async def ask(q: str = Form(...), mode: str = Depends(retrieval_mode), where: Optional[dict] = Depends(query_filters)):
+    result = await audited_query(q, mode, where)
     return result
 
+@app.post('/api/query/batch')
+async def ask_batch(
+    questions: List[str] = Form(...),
+    mode: str = Depends(retrieval_mode),
+    where: Optional[dict] = Depends(query_filters)
+):
+    # Repeat the questions field once per question
+    if len(questions) > BATCH_QUERY_MAX:
+        raise HTTPException(status_code=413, detail=f'At most {BATCH_QUERY_MAX} questions per batch')
+    return {'results': await query_batch(questions, mode, where)}
+
+@app.post('/api/query/stream')
+async def ask_stream(q: str = Form(...), mode: str = Depends(retrieval_mode), where: Optional[dict] = Depends(query_filters)):
+    return StreamingResponse(
+        query_stream(q, mode, where),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 if __name__ == '__main__':
-    uvicorn.run(app, host='0.0.0.0', port=8000, log_level='info')
+    # Single process; for several workers use gunicorn -c gunicorn.conf.py main:app
+    uvicorn.run(app, host='0.0.0.0', port=PORT, log_level='info')
@@ -0,0 +1,202 @@
+"""
+Per-stage latency histograms and counters in Prometheus text format.
+
+Stages (label stage=...): chunk, embed, store_write, query_embed,
+retrieve, prompt_build, llm_ttft, llm_total. Counters cover chunks
+ingested and upstream errors; values that other components already count
+(cache hits, index size, memory) are read at scrape time through
+callbacks, so the hot path pays nothing for them.
+
+With METRICS_ENABLED=false every call is an early return and timers
+are a shared no-op context manager.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'archaeomind'
+# Seconds; spans sub-millisecond retrieval up to slow LLM completions
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram (one per label set)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of stage histograms, counters and scrape-time callbacks.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled: False turns every record call into a no-op
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[Labels, Histogram] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._callbacks: List[Tuple[str, Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = []
+        self.describe('stage_duration_seconds', 'histogram', 'Time spent per pipeline stage')
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        """Declare a metric's type and HELP line"""
+        self._help[name] = (kind, help_text)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record one stage duration"""
+        if not self.enabled:
+            return
+        key = (('stage', stage),)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def time(self, stage: str):
+        """Context manager recording the duration of its block under stage"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer(stage)
+
+    @contextmanager
+    def _timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Increase a counter"""
+        if not self.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def register_callback(self, name: str, kind: str, help_text: str,
+                          fn: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> None:
+        """
+        Expose a value owned elsewhere, read only when /metrics is scraped.
+
+        Args:
+            name: Metric name without prefix
+            kind: counter | gauge
+            help_text: HELP line
+            fn: Returns (labels, value) pairs; errors skip the metric
+        """
+        self.describe(name, kind, help_text)
+        self._callbacks.append((name, fn))
+
+    def snapshot(self) -> Dict:
+        """Stage summaries as JSON-friendly data (count, mean and sum in ms)"""
+        with self._lock:
+            return {
+                dict(key)['stage']: {
+                    'count': h.count,
+                    'sum_ms': round(h.sum * 1000, 2),
+                    'mean_ms': round(h.sum / h.count * 1000, 2) if h.count else None,
+                }
+                for key, h in self._histograms.items()
+            }
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+
+        def header(name):
+            kind, help_text = self._help.get(name, ('untyped', name))
+            lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+
+        with self._lock:
+            histograms = {k: (h.buckets, list(h.counts), h.sum, h.count) for k, h in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+
+        if histograms:
+            header('stage_duration_seconds')
+            metric = f'{PREFIX}_stage_duration_seconds'
+            for key, (buckets, counts, total, count) in sorted(histograms.items()):
+                cumulative = 0
+                for bound, n in zip(buckets + ('+Inf',), counts):
+                    cumulative += n
+                    le = 'le="%s"' % bound
+                    lines.append(f'{metric}_bucket{_format_labels(key, le)} {cumulative}')
+                lines.append(f'{metric}_sum{_format_labels(key)} {total}')
+                lines.append(f'{metric}_count{_format_labels(key)} {count}')
+
+        for name, series in sorted(counters.items()):
+            header(name)
+            for key, value in sorted(series.items()):
+                lines.append(f'{PREFIX}_{name}{_format_labels(key)} {value}')
+
+        for name, fn in self._callbacks:
+            try:
+                samples = list(fn())
+            except Exception as e:
+                logger.warning(f"Metric callback {name} failed: {e}")
+                continue
+            if not samples:
+                continue
+            header(name)
+            for labels, value in samples:
+                lines.append(f'{PREFIX}_{name}{_format_labels(_labels(labels))} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def process_memory() -> Iterable[Tuple[Dict[str, str], float]]:
+    """Resident set size in bytes (Linux /proc; empty elsewhere)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return []
+    return [({}, pages * os.sysconf('SC_PAGE_SIZE'))]
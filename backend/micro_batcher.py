@@ -0,0 +1,114 @@
+"""
+Dynamic micro-batching for concurrent requests.
+
+Concurrent /api/query calls each need one question embedding. Encoding
+them one at a time wastes the model's batch parallelism, so callers hand
+their item to a MicroBatcher instead: items that arrive within max_wait_ms
+of each other (up to max_batch_size) go through a single batched call, and
+each caller's future resolves with its own row.
+
+A lone request waits at most max_wait_ms; while a batch is being encoded,
+new arrivals queue up and form the next batch, so batch size grows with
+load on its own.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects items from concurrent coroutines into batched calls of fn.
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], Sequence[Any]], max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        """
+        Args:
+            fn: Blocking batch function (run in a worker thread); must return
+                one result per input, in order
+            max_batch_size: Largest batch handed to fn
+            max_wait_ms: How long the first item of a batch waits for company
+        """
+        self.fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Queues and tasks are bound to one event loop; rebind if it changed
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = await self._loop.run_in_executor(None, self.fn, items)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Batched call of {len(items)} items failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(items)
+        for (_, future), result in zip(batch, results):
+            if not future.done():  # caller may have been cancelled
+                future.set_result(result)
+
+    async def aclose(self) -> None:
+        """Stop the worker task (pending callers are cancelled)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,171 @@
+"""
+ONNX Runtime CPU backend for the sentence embedding model.
+
+Exports the transformer inside a SentenceTransformer to ONNX once
+(optionally with int8 dynamic quantization), then serves encode() through
+onnxruntime with mean pooling + L2 normalization, matching the PyTorch
+pipeline of all-MiniLM-L6-v2. Exposes the subset of the SentenceTransformer
+API that EmbeddingManager uses, so it is a drop-in replacement.
+
+Requires the optional packages onnx and onnxruntime.
+"""
+
+import json
+import logging
+import os
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def export_model(model_name: str, out_dir: str, quantize: bool = False) -> str:
+    """
+    Export a SentenceTransformer's transformer to ONNX.
+
+    Args:
+        model_name: Sentence Transformers model id
+        out_dir: Directory for model.onnx, tokenizer files and pooling config
+        quantize: Also write model.int8.onnx (dynamic int8 weights)
+
+    Returns:
+        out_dir
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    st = SentenceTransformer(model_name, device='cpu')
+    transformer = st[0]
+    pooling = next((m for m in st if isinstance(m, Pooling)), None)
+    if pooling is not None and not pooling.pooling_mode_mean_tokens:
+        raise ValueError(f'{model_name}: only mean pooling is supported by the ONNX backend')
+
+    os.makedirs(out_dir, exist_ok=True)
+    transformer.tokenizer.save_pretrained(out_dir)
+
+    class _Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            ).last_hidden_state
+
+    sample = transformer.tokenizer(['export sample'], return_tensors='pt', padding=True)
+    token_type_ids = sample.get('token_type_ids', torch.zeros_like(sample['input_ids']))
+    dynamic = {0: 'batch', 1: 'sequence'}
+    path = os.path.join(out_dir, 'model.onnx')
+    with torch.no_grad():
+        torch.onnx.export(
+            _Encoder(transformer.auto_model.eval()),
+            (sample['input_ids'], sample['attention_mask'], token_type_ids),
+            path,
+            input_names=['input_ids', 'attention_mask', 'token_type_ids'],
+            output_names=['last_hidden_state'],
+            dynamic_axes={
+                'input_ids': dynamic, 'attention_mask': dynamic,
+                'token_type_ids': dynamic, 'last_hidden_state': dynamic,
+            },
+            opset_version=14,
+        )
+
+    with open(os.path.join(out_dir, 'pooling.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'model_name': model_name,
+            'dim': st.get_sentence_embedding_dimension(),
+            'max_seq_length': st.max_seq_length,
+            'normalize': any(isinstance(m, Normalize) for m in st),
+        }, f)
+
+    if quantize:
+        quantize_model(out_dir)
+    logger.info(f"✅ Exported {model_name} to {path}")
+    return out_dir
+
+
+def quantize_model(out_dir: str) -> str:
+    """Write model.int8.onnx with dynamically quantized int8 weights"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    target = os.path.join(out_dir, 'model.int8.onnx')
+    quantize_dynamic(os.path.join(out_dir, 'model.onnx'), target, weight_type=QuantType.QInt8)
+    return target
+
+
+class OnnxSentenceEncoder:
+    """
+    onnxruntime-backed encoder with the SentenceTransformer.encode() API.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, threads: int = 0):
+        """
+        Args:
+            model_dir: Directory produced by export_model()
+            quantized: Load model.int8.onnx instead of model.onnx
+            threads: intra-op threads (0 lets onnxruntime decide)
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, 'pooling.json'), encoding='utf-8') as f:
+            self.config = json.load(f)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        model_file = 'model.int8.onnx' if quantized else 'model.onnx'
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=['CPUExecutionProvider']
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_seq_length = self.config['max_seq_length']
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        logger.info(f"✅ ONNX encoder ready ({model_file}, threads={threads or 'auto'})")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config['dim']
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, show_progress_bar: bool = False) -> np.ndarray:
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        # Length-sorted batches minimize padding, as SentenceTransformer does
+        order = np.argsort([-len(t) for t in texts], kind='stable')
+        out = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            out[idx] = self._encode_batch([texts[i] for i in idx])
+        return out[0] if single else out
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        enc = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors='np'
+        )
+        feeds = {
+            'input_ids': enc['input_ids'].astype(np.int64),
+            'attention_mask': enc['attention_mask'].astype(np.int64),
+        }
+        if 'token_type_ids' in self._inputs:
+            feeds['token_type_ids'] = enc.get('token_type_ids', np.zeros_like(enc['input_ids'])).astype(np.int64)
+        hidden = self.session.run(None, feeds)[0]
+        # Mean pooling over real (unpadded) tokens
+        mask = feeds['attention_mask'][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config['normalize']:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+def load_onnx_encoder(model_name: str, model_dir: str, quantized: bool = False, threads: int = 0) -> OnnxSentenceEncoder:
+    """Load an exported model, exporting (and quantizing) it on first use"""
+    needed = 'model.int8.onnx' if quantized else 'model.onnx'
+    if not os.path.exists(os.path.join(model_dir, 'model.onnx')):
+        print(f'🔄 Exporting {model_name} to ONNX...')
+        export_model(model_name, model_dir, quantize=quantized)
+    elif not os.path.exists(os.path.join(model_dir, needed)):
+        quantize_model(model_dir)
+    return OnnxSentenceEncoder(model_dir, quantized, threads)
@@ -0,0 +1,109 @@
+"""
+Query-side caches for the RAG endpoint.
+
+Two levels:
+1. Normalized question -> embedding (skips the model for repeated questions)
+2. (question, retrieved chunk ids, model, prompt template) -> answer
+   (skips the LLM round-trip), scoped to the current corpus version so any
+   upload invalidates every cached answer.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r'\s+', ' ', question).strip().lower().rstrip('?!. ')
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU mapping with hit/miss counters.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+class QueryCache:
+    """
+    Question-embedding LRU plus a corpus-versioned answer cache.
+    """
+
+    def __init__(self, embedding_size: int = 1024, answer_size: int = 512):
+        """
+        Args:
+            embedding_size: Max cached question embeddings
+            answer_size: Max cached answers
+        """
+        self.embeddings = LRUCache(embedding_size)
+        self.answers = LRUCache(answer_size)
+        self.corpus_version = 0
+
+    def get_embedding(self, question: str) -> Optional[np.ndarray]:
+        return self.embeddings.get(normalize_question(question))
+
+    def put_embedding(self, question: str, embedding: np.ndarray) -> None:
+        self.embeddings.put(normalize_question(question), embedding)
+
+    def answer_key(self, question: str, chunk_ids: Sequence[str], model: str, template: str) -> Tuple:
+        """Build the answer cache key for one retrieval result"""
+        template_hash = hashlib.sha1(template.encode('utf-8')).hexdigest()
+        return (self.corpus_version, normalize_question(question), tuple(chunk_ids), model, template_hash)
+
+    def get_answer(self, key: Tuple) -> Optional[Dict]:
+        return self.answers.get(key)
+
+    def put_answer(self, key: Tuple, answer: Dict) -> None:
+        # A key built before an upload must not repopulate the new version
+        if key[0] == self.corpus_version:
+            self.answers.put(key, answer)
+
+    def bump_version(self) -> int:
+        """Mark the collection as changed; drops every cached answer"""
+        self.corpus_version += 1
+        self.answers.clear()
+        return self.corpus_version
+
+    def stats(self) -> Dict:
+        return {
+            'corpus_version': self.corpus_version,
+            'embeddings': self.embeddings.stats(),
+            'answers': self.answers.stats(),
+            'llm_calls_saved': self.answers.hits,
+        }
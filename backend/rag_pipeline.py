@@ -1,27 +1,30 @@
-﻿import numpy as np
-from groq import Groq
-from config import GROQ_API_KEY, LLM_MODEL, CHUNK_SIZE, TOP_K
-from embeddings import embedder
-from chroma_handler import db
-from prompts import RAG_PROMPT
+﻿from config import GROQ_API_KEY, LLM_MODEL, TOP_K
+from prompts import format_rag_prompt
 
-client = Groq(api_key=GROQ_API_KEY)
+client = None
+
+def get_client():
+    # Created on first query rather than as an import side effect
+    global client
+    if client is None:
+        from groq import Groq
+        client = Groq(api_key=GROQ_API_KEY)
+    return client
 
 class RAG:
     def ingest(self, text, filename):
-        chunks = [text[i:i+CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE//2)]
-        embeddings = [embedder.embed(c) for c in chunks]
-        ids = [f'{filename}_{i}' for i in range(len(chunks))]
-        db.add(embeddings, chunks, ids)
-        return {'chunks': len(chunks)}
+        # Same path as /upload, so the BM25, dedup, date and document indexes stay in step
+        import main
+        result = main.ingest(text, filename)
+        return {'chunks': result['chunks']}
     
     def query(self, question):
-        q_emb = embedder.embed(question)
-        chunks = db.search(q_emb, TOP_K)
-        context = '\\n'.join(chunks)
-        response = client.chat.completions.create(
+        import main
+        chunks, _, _ = main.retrieve(question, top_k=TOP_K)
+        context = '\n'.join(chunks)
+        response = get_client().chat.completions.create(
             model=LLM_MODEL,
-            messages=[{'role': 'user', 'content': RAG_PROMPT.format(context=context, question=question)}]
+            messages=[{'role': 'user', 'content': format_rag_prompt(context, question)}]
         )
         return {'answer': response.choices[0].message.content, 'sources': chunks}
 
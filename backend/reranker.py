@@ -0,0 +1,119 @@
+"""
+Cross-encoder reranking of retrieved candidates.
+
+Vector search returns a wide candidate set cheaply; a small CPU
+cross-encoder then scores each (question, chunk) pair jointly and the
+best few go to the LLM. Pairs are scored in batches, scores are cached
+per (question, chunk id) - chunk ids change whenever chunk text does -
+and each request has a time budget: when the remaining batches would not
+finish in time, the candidates keep their vector order. Scores computed
+before giving up are still cached, so a repeated question reranks fully.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+from query_cache import LRUCache, normalize_question
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Latency-bounded reranker around a sentence-transformers CrossEncoder.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 16,
+        budget_ms: float = 150.0,
+        cache_size: int = 4096,
+        max_length: int = 256
+    ):
+        """
+        Args:
+            model_name: CrossEncoder model id (e.g. cross-encoder/ms-marco-MiniLM-L-6-v2)
+            batch_size: Pairs per forward pass
+            budget_ms: Per-request scoring budget before falling back to vector order
+            cache_size: Cached (question, chunk id) scores
+            max_length: Token limit per pair (longer chunks are truncated by the model)
+        """
+        # Deferred: importing sentence_transformers pulls in torch (seconds)
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name, max_length=max_length)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.budget = budget_ms / 1000
+        self.scores = LRUCache(cache_size)
+        self._lock = threading.Lock()
+        self.counts = {'reranked': 0, 'fallbacks': 0}
+        # Seconds per scored pair, carried across calls so even the first batch
+        # of a request is checked against the budget; seeded by calibrate()
+        self._pair_seconds = None
+        logger.info(f"✅ Loaded reranker: {model_name}")
+
+    def calibrate(self) -> float:
+        """
+        Time one batch to seed the per-pair cost estimate.
+
+        Runs a forward pass, so call it in the serving process (worker warmup
+        or the first rerank), never before a fork.
+
+        Returns:
+            Seconds per pair
+        """
+        started = time.perf_counter()
+        self.model.predict([('warmup', 'warmup')] * self.batch_size, batch_size=self.batch_size)
+        self._pair_seconds = (time.perf_counter() - started) / self.batch_size
+        return self._pair_seconds
+
+    def rerank(self, question: str, ids: Sequence[str], chunks: Sequence[str], top_k: int) -> Tuple[List[int], bool]:
+        """
+        Order candidates by cross-encoder score.
+
+        Args:
+            question: User question
+            ids: Candidate chunk ids, in vector order
+            chunks: Candidate texts
+            top_k: Positions to return
+
+        Returns:
+            (positions of the top_k candidates, whether they were reranked);
+            on timeout the first top_k positions in vector order
+        """
+        if self._pair_seconds is None:
+            self.calibrate()  # no warmup ran; not charged to this request's budget
+        started = time.perf_counter()
+        normalized = normalize_question(question)
+        scores: Dict[int, float] = {}
+        todo = []
+        for i, chunk_id in enumerate(ids):
+            cached = self.scores.get((normalized, chunk_id))
+            if cached is None:
+                todo.append(i)
+            else:
+                scores[i] = cached
+        for start in range(0, len(todo), self.batch_size):
+            batch = todo[start:start + self.batch_size]
+            batch_started = time.perf_counter()
+            # Stop before a batch that would not finish in time
+            if batch_started - started + self._pair_seconds * len(batch) > self.budget:
+                with self._lock:
+                    self.counts['fallbacks'] += 1
+                return list(range(min(top_k, len(ids)))), False
+            predicted = self.model.predict([(question, chunks[i]) for i in batch], batch_size=self.batch_size)
+            for i, score in zip(batch, predicted):
+                scores[i] = float(score)
+                self.scores.put((normalized, ids[i]), float(score))
+            # Moving average, so a one-off slow batch does not disable reranking
+            pair_seconds = (time.perf_counter() - batch_started) / len(batch)
+            self._pair_seconds = 0.8 * self._pair_seconds + 0.2 * pair_seconds
+        with self._lock:
+            self.counts['reranked'] += 1
+        return sorted(scores, key=lambda i: (-scores[i], i))[:top_k], True
+
+    def stats(self) -> Dict:
+        return {'model': self.model_name, **self.counts, 'cache': self.scores.stats()}
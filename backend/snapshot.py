@@ -0,0 +1,168 @@
+"""
+Compact on-disk index snapshots.
+
+A snapshot is a directory holding:
+    embeddings.npy   float32 matrix [n, dim], loadable with mmap_mode='r'
+    chunks.jsonl     one {"id", "document", "metadata"} object per row
+    manifest.json    format version, row count, dimension, creation time
+
+Mapping the matrix is O(1) regardless of corpus size, so a cold start
+only pays for reading the chunk texts instead of re-embedding them.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+@dataclass
+class Snapshot:
+    ids: List[str]
+    embeddings: np.ndarray
+    documents: List[str]
+    metadatas: List[Optional[Dict]]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def snapshot_exists(directory: str) -> bool:
+    return os.path.exists(os.path.join(directory, 'manifest.json'))
+
+
+def write_snapshot(
+    directory: str,
+    ids: List[str],
+    embeddings: np.ndarray,
+    documents: List[str],
+    metadatas: Optional[List[Optional[Dict]]] = None
+) -> None:
+    """
+    Atomically write a snapshot (built in a sibling temp dir, then swapped in).
+
+    Args:
+        directory: Target snapshot directory
+        ids: Chunk ids, one per row
+        embeddings: Matrix of shape [n, dim] (anything sliceable by rows)
+        documents: Chunk texts
+        metadatas: Optional per-chunk metadata
+    """
+    if len(embeddings) != len(ids) or len(documents) != len(ids):
+        raise ValueError('ids, embeddings and documents must have the same length')
+    metadatas = metadatas or [None] * len(ids)
+    n, dim = len(ids), (embeddings.shape[1] if len(embeddings.shape) == 2 else 0)
+
+    tmp = f'{directory.rstrip(os.sep)}.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    # Copy in slices so writing never needs a second full copy of the matrix
+    matrix = np.lib.format.open_memmap(os.path.join(tmp, 'embeddings.npy'), mode='w+', dtype=np.float32, shape=(n, dim))
+    for start in range(0, n, 8192):
+        matrix[start:start + 8192] = embeddings[start:start + 8192]
+    matrix.flush()
+    del matrix
+    with open(os.path.join(tmp, 'chunks.jsonl'), 'w', encoding='utf-8') as f:
+        for chunk_id, doc, meta in zip(ids, documents, metadatas):
+            f.write(json.dumps({'id': chunk_id, 'document': doc, 'metadata': meta}, ensure_ascii=False) + '\n')
+    with open(os.path.join(tmp, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'format_version': FORMAT_VERSION,
+            'count': len(ids),
+            'dim': dim,
+            'created_at': time.time(),
+        }, f)
+
+    old = f'{directory.rstrip(os.sep)}.old'
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(directory):
+        os.replace(directory, old)
+    os.replace(tmp, directory)
+    shutil.rmtree(old, ignore_errors=True)
+    logger.info(f"Wrote snapshot of {len(ids)} chunks to {directory}")
+
+
+def load_snapshot(directory: str, mmap: bool = True) -> Snapshot:
+    """
+    Load a snapshot.
+
+    Args:
+        directory: Snapshot directory
+        mmap: Map the embedding matrix read-only instead of reading it
+
+    Returns:
+        Snapshot whose embeddings are a (memory-mapped) float32 matrix
+    """
+    with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format_version')}")
+
+    embeddings = np.load(os.path.join(directory, 'embeddings.npy'), mmap_mode='r' if mmap else None)
+    ids, documents, metadatas = [], [], []
+    with open(os.path.join(directory, 'chunks.jsonl'), encoding='utf-8') as f:
+        for line in f:
+            row = json.loads(line)
+            ids.append(row['id'])
+            documents.append(row['document'])
+            metadatas.append(row.get('metadata'))
+    if len(ids) != len(embeddings):
+        raise ValueError(f'Corrupt snapshot: {len(ids)} chunks vs {len(embeddings)} vectors')
+    return Snapshot(ids, embeddings, documents, metadatas)
+
+
+def load_snapshot_embeddings(directory: str) -> np.ndarray:
+    """Map only the embedding matrix of a snapshot, read-only"""
+    return np.load(os.path.join(directory, 'embeddings.npy'), mmap_mode='r')
+
+
+def export_collection(collection, directory: str, page_size: int = 1000) -> int:
+    """
+    Page a Chroma collection out into a snapshot.
+
+    Returns:
+        Number of chunks written
+    """
+    ids, vectors, documents, metadatas = [], [], [], []
+    offset = 0
+    while True:
+        page = collection.get(include=['embeddings', 'documents', 'metadatas'], limit=page_size, offset=offset)
+        if not page['ids']:
+            break
+        ids.extend(page['ids'])
+        vectors.extend(page['embeddings'])
+        documents.extend(page['documents'])
+        metadatas.extend(page['metadatas'] or [None] * len(page['ids']))
+        offset += len(page['ids'])
+    dim = len(vectors[0]) if vectors else 0
+    write_snapshot(directory, ids, np.asarray(vectors, dtype=np.float32).reshape(len(ids), dim), documents, metadatas)
+    return len(ids)
+
+
+def restore_collection(collection, snapshot: Snapshot, batch_size: int = 1000) -> int:
+    """
+    Bulk-load a snapshot into an empty Chroma collection.
+
+    Returns:
+        Number of chunks restored
+    """
+    for start in range(0, len(snapshot), batch_size):
+        end = start + batch_size
+        metas = snapshot.metadatas[start:end]
+        collection.add(
+            ids=snapshot.ids[start:end],
+            embeddings=np.asarray(snapshot.embeddings[start:end]).tolist(),
+            documents=snapshot.documents[start:end],
+            metadatas=metas if all(metas) else None,
+        )
+    logger.info(f"Restored {len(snapshot)} chunks from snapshot")
+    return len(snapshot)
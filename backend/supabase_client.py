@@ -0,0 +1,350 @@
+"""
+Non-blocking audit logging to Supabase.
+
+The log_* methods only append a row to a bounded in-process queue and
+return immediately; a background asyncio task drains the queue, batching
+rows per table into one insert each, retrying failures with exponential
+backoff. When the queue is full (or a batch keeps failing) rows are
+spilled to a local JSONL file, or dropped if no spill path is set, and the
+spill file is replayed on the next start. close() flushes what is left.
+Each process spills to its own file (pid suffix), so server workers
+sharing one spill path never append to or replay the same file.
+
+The writer talks to a sink with a single insert(table, rows) method, so
+local development and checks can use JsonlSink / MemorySink instead of a
+live Supabase project.
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import random
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SupabaseSink:
+    """Inserts rows through the (synchronous) supabase-py client"""
+
+    def __init__(self, supabase_url: str, supabase_key: str):
+        from supabase import create_client  # optional dependency
+        self.client = create_client(supabase_url, supabase_key)
+        logger.info("✅ Supabase client initialized")
+
+    def insert(self, table: str, rows: List[Dict]) -> None:
+        self.client.table(table).insert(rows).execute()
+
+
+class JsonlSink:
+    """Local stand-in: appends {"table", "row"} lines to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def insert(self, table: str, rows: List[Dict]) -> None:
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps({'table': table, 'row': row}, ensure_ascii=False, default=str) + '\n')
+
+
+class MemorySink:
+    """In-memory stand-in that can simulate failing inserts"""
+
+    def __init__(self, fail_times: int = 0):
+        self.tables: Dict[str, List[Dict]] = {}
+        self.calls = 0
+        self.fail_times = fail_times
+
+    def insert(self, table: str, rows: List[Dict]) -> None:
+        self.calls += 1
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError('simulated insert failure')
+        self.tables.setdefault(table, []).extend(rows)
+
+
+class SupabaseClient:
+    """
+    Batched, non-blocking audit logger for documents, queries, artifacts
+    and timelines.
+    """
+
+    def __init__(
+        self,
+        sink,
+        max_queue: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        spill_path: Optional[str] = None
+    ):
+        """
+        Args:
+            sink: Object with insert(table, rows), e.g. SupabaseSink
+            max_queue: Rows held in memory before overflowing
+            batch_size: Rows drained per round (and queue size that wakes the drain early)
+            flush_interval: Seconds between drains when the queue is quiet
+            max_retries: Retries per failed insert before spilling
+            backoff: First retry delay in seconds (doubles per attempt, with jitter)
+            spill_path: JSONL file for overflow and failed rows (None drops them);
+                rows go to spill_path with this process's pid before the extension
+        """
+        self.sink = sink
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.spill_path = spill_path
+        if spill_path:
+            os.makedirs(os.path.dirname(os.path.abspath(spill_path)), exist_ok=True)
+        self._pending: deque = deque()
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._loop = None
+        self._wake = None
+        self._task = None
+        self._closing = False
+        self.counts = {'queued': 0, 'written': 0, 'retried': 0, 'spilled': 0, 'dropped': 0}
+
+    # ------------------------------------------------------------------
+    # Producer side: safe to call from the event loop or worker threads
+    # ------------------------------------------------------------------
+
+    def log(self, table: str, row: Dict[str, Any]) -> bool:
+        """
+        Queue one row without blocking.
+
+        Returns:
+            False if the queue was full and the row was spilled or dropped
+        """
+        with self._lock:
+            if len(self._pending) >= self.max_queue:
+                accepted = False
+            else:
+                self._pending.append((table, row))
+                self.counts['queued'] += 1
+                accepted = True
+                wake = len(self._pending) >= self.batch_size
+        if not accepted:
+            self._overflow([(table, row)])
+            return False
+        if wake and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return True
+
+    def log_document_upload(self, document_id: str, filename: str, file_size_mb: float) -> bool:
+        """Log a document upload event"""
+        return self.log('documents', {
+            'document_id': document_id,
+            'filename': filename,
+            'file_size_mb': file_size_mb,
+            'uploaded_at': datetime.utcnow().isoformat(),
+            'status': 'processed'
+        })
+
+    def log_query(self, query_text: str, answer: str, sources_count: int) -> bool:
+        """Log a RAG query and response"""
+        return self.log('queries', {
+            'query_text': query_text,
+            'answer': answer,
+            'sources_count': sources_count,
+            'created_at': datetime.utcnow().isoformat()
+        })
+
+    def log_artifact_analysis(self, artifact_name: str, analysis_type: str, results: Dict) -> bool:
+        """Log artifact analysis"""
+        return self.log('artifacts', {
+            'artifact_name': artifact_name,
+            'analysis_type': analysis_type,
+            'results': results,
+            'analyzed_at': datetime.utcnow().isoformat()
+        })
+
+    def log_timeline(self, topic: str, timeline: List[Dict]) -> bool:
+        """Log generated timeline"""
+        return self.log('timelines', {
+            'topic': topic,
+            'timeline': timeline,
+            'created_at': datetime.utcnow().isoformat()
+        })
+
+    # ------------------------------------------------------------------
+    # Drain side (event loop)
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Replay spilled rows and start the background drain task"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._closing = False
+        self._replay_spill()
+        self._task = self._loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+        await self.flush()  # rows queued while closing
+
+    async def flush(self) -> None:
+        """Write everything queued so far"""
+        while True:
+            with self._lock:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            if not batch:
+                return
+            by_table: Dict[str, List[Dict]] = {}
+            for table, row in batch:
+                by_table.setdefault(table, []).append(row)
+            try:
+                for table, rows in list(by_table.items()):
+                    await self._write(table, rows)
+                    del by_table[table]  # only once written (or spilled) by _write
+            except asyncio.CancelledError:
+                # Shutdown timed out mid-batch: requeue the rows not yet written,
+                # including the insert in flight, so close() spills them
+                with self._lock:
+                    self._pending.extendleft(reversed([(table, row) for table, rows in by_table.items() for row in rows]))
+                raise
+
+    async def _write(self, table: str, rows: List[Dict]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await asyncio.to_thread(self.sink.insert, table, rows)
+                self.counts['written'] += len(rows)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Audit insert into {table} failed after {attempt + 1} attempts: {e}")
+                    break
+                self.counts['retried'] += 1
+                await asyncio.sleep(self.backoff * (2 ** attempt) * random.uniform(0.8, 1.2))
+        self._overflow([(table, row) for row in rows])
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Stop the drain task after a final flush (spilling what is left on timeout)"""
+        if self._task is not None:
+            self._closing = True
+            self._wake.set()
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Audit flush timed out; spilling remaining rows")
+            self._task = None
+        with self._lock:
+            rest = list(self._pending)
+            self._pending.clear()
+        if rest:
+            self._overflow(rest)
+        self._loop = None
+        logger.info(f"Audit logger closed {self.counts}")
+
+    # ------------------------------------------------------------------
+    # Overflow handling
+    # ------------------------------------------------------------------
+
+    def _overflow(self, items) -> None:
+        if not self.spill_path:
+            self.counts['dropped'] += len(items)
+            return
+        with self._spill_lock:
+            with open(self._spill_file(os.getpid()), 'a', encoding='utf-8') as f:
+                for table, row in items:
+                    f.write(json.dumps({'table': table, 'row': row}, ensure_ascii=False, default=str) + '\n')
+        self.counts['spilled'] += len(items)
+
+    def _spill_file(self, pid: int) -> str:
+        root, ext = os.path.splitext(self.spill_path)
+        return f'{root}.{pid}{ext}'
+
+    def _claim_spills(self) -> List[str]:
+        """Rename this process's spill file and those of exited processes out of the way"""
+        root, ext = os.path.splitext(self.spill_path)
+        claimed = []
+        # The unsuffixed file is what versions before per-process spilling wrote
+        for path in [self.spill_path, *glob.glob(f'{glob.escape(root)}.*{glob.escape(ext)}')]:
+            if path != self.spill_path:
+                pid = path[len(root) + 1:len(path) - len(ext)]
+                if not pid.isdigit() or (int(pid) != os.getpid() and _alive(int(pid))):
+                    continue  # a running worker is still appending to it
+            target = f'{path}.replay.{os.getpid()}'
+            try:
+                os.rename(path, target)  # atomic: exactly one starting worker wins
+            except FileNotFoundError:
+                continue
+            claimed.append(target)
+        return claimed
+
+    def _replay_spill(self) -> None:
+        if not self.spill_path:
+            return
+        items = []
+        with self._spill_lock:
+            for path in self._claim_spills():
+                with open(path, encoding='utf-8') as f:
+                    items.extend(json.loads(line) for line in f if line.strip())
+                os.remove(path)
+        with self._lock:
+            room = self.max_queue - len(self._pending)
+            self._pending.extend((item['table'], item['row']) for item in items[:room])
+        if len(items) > room:
+            self._overflow([(item['table'], item['row']) for item in items[room:]])
+        if items:
+            logger.info(f"Replaying {min(len(items), room)} spilled audit rows")
+
+    def stats(self) -> Dict:
+        return {**self.counts, 'pending': len(self._pending)}
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+
+def create_audit_logger(
+    sink_name: str,
+    supabase_url: str = None,
+    supabase_key: str = None,
+    jsonl_path: str = None,
+    **options
+) -> Optional[SupabaseClient]:
+    """
+    Build the configured audit logger.
+
+    Args:
+        sink_name: supabase | jsonl | off
+        supabase_url: Project URL (supabase sink)
+        supabase_key: Service key (supabase sink)
+        jsonl_path: Output file (jsonl sink)
+        **options: Passed to SupabaseClient
+
+    Returns:
+        SupabaseClient, or None when auditing is off
+    """
+    if sink_name == 'off':
+        return None
+    if sink_name == 'supabase':
+        sink = SupabaseSink(supabase_url, supabase_key)
+    elif sink_name == 'jsonl':
+        sink = JsonlSink(jsonl_path)
+    else:
+        raise ValueError(f'Unknown audit sink: {sink_name}')
+    return SupabaseClient(sink, **options)
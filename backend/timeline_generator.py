@@ -0,0 +1,360 @@
+"""
+Date index and timeline generation.
+
+Ingest extracts dated expressions from every chunk ("2600 BCE",
+"c. 2500 BC", "2600-1900 BCE", "AD 320", "3rd millennium BCE",
+"5th century BC") into a date index sorted by start year and persisted as
+JSON. Years are signed integers: BCE/BC negative, CE/AD positive.
+
+A timeline for a topic is then a range scan over the index plus a
+relevance filter (lexical scores of the chunks the dates came from), with
+no LLM call; results are cached per topic until the index changes.
+"""
+
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from delta_log import DeltaLog, file_bytes, latest
+from query_cache import LRUCache, normalize_question
+
+logger = logging.getLogger(__name__)
+
+_ERA = r'(B\.C\.(?:E\.)?|C\.E\.|A\.D\.|BCE|BC|CE|AD)'
+_APPROX = r'(?:\b(c\.|ca\.|circa|around|about|approximately)\s*)?'
+# "2,600" as well as "2600"; never the tail of a longer number ("600" in "2,600")
+_YEAR = r'(?<![\d,])(\d{1,3}(?:,\d{3})+|\d{1,5})'
+_RANGE_RE = re.compile(
+    _APPROX + _YEAR + r'\s*' + _ERA + r'?\s*(?:-|–|—|to|until)\s*' + r'(?:c\.\s*|ca\.\s*)?' + _YEAR + r'\s*' + _ERA + r'(?![A-Za-z])',
+    re.I,
+)
+# "between 2600 and 1900 BCE": a range whose separator is not a dash or "to"
+_BETWEEN_RE = re.compile(
+    _APPROX + r'\bbetween\s+' + _YEAR + r'\s*' + _ERA + r'?\s+and\s+' + r'(?:c\.\s*|ca\.\s*)?' + _YEAR + r'\s*' + _ERA + r'(?![A-Za-z])',
+    re.I,
+)
+_SINGLE_RE = re.compile(_APPROX + _YEAR + r'\s*' + _ERA + r'(?![A-Za-z])', re.I)
+_AD_PREFIX_RE = re.compile(_APPROX + r'\b(A\.D\.|AD)\s*(\d{1,3}(?:,\d{3})+|\d{1,4})\b', re.I)
+_PERIOD_RE = re.compile(r'(\d{1,2})(?:st|nd|rd|th)\s+(century|millennium)\s*' + _ERA + r'(?![A-Za-z])', re.I)
+# A period followed by a digit ("c. 2500") is not a sentence end
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z"(])|\n+')
+
+
+@dataclass
+class DateMention:
+    start: int            # signed year, BCE negative
+    end: int              # equal to start for a single year
+    label: str            # the matched text, e.g. "c. 2500 BCE"
+    approximate: bool
+    offset: int           # character offset within the chunk
+
+
+def _signed(year: str, era: Optional[str]) -> int:
+    value = int(year.replace(',', ''))
+    return -value if era and era.upper().replace('.', '').startswith('B') else value
+
+
+def extract_dates(text: str) -> List[DateMention]:
+    """
+    Find dated expressions in text.
+
+    Returns:
+        Mentions in order of appearance; overlapping matches are resolved in
+        favour of ranges, then centuries/millennia, then single years
+    """
+    mentions: List[DateMention] = []
+    taken: List[range] = []
+
+    def free(span):
+        return not any(span[0] < r.stop and r.start < span[1] for r in taken)
+
+    def keep(match, start, end, approximate):
+        taken.append(range(*match.span()))
+        lo, hi = sorted((start, end))
+        mentions.append(DateMention(lo, hi, match.group().strip(), approximate, match.start()))
+
+    for m in [*_BETWEEN_RE.finditer(text), *_RANGE_RE.finditer(text)]:
+        if not free(m.span()):
+            continue
+        approx, first, first_era, second, second_era = m.groups()
+        # "2600-1900 BCE": the era written once applies to both ends
+        keep(m, _signed(first, first_era or second_era), _signed(second, second_era), bool(approx))
+    for m in _PERIOD_RE.finditer(text):
+        if not free(m.span()):
+            continue
+        number, unit, era = m.groups()
+        size = 100 if unit.lower() == 'century' else 1000
+        n = int(number)
+        if _signed('1', era) < 0:
+            keep(m, -n * size, -(n - 1) * size - 1, True)
+        else:
+            keep(m, (n - 1) * size + 1, n * size, True)
+    for m in _AD_PREFIX_RE.finditer(text):
+        if free(m.span()):
+            keep(m, _signed(m.group(3), None), _signed(m.group(3), None), bool(m.group(1)))
+    for m in _SINGLE_RE.finditer(text):
+        if free(m.span()):
+            approx, year, era = m.groups()
+            keep(m, _signed(year, era), _signed(year, era), bool(approx))
+    return sorted(mentions, key=lambda d: d.offset)
+
+
+def sentence_at(text: str, offset: int, limit: int = 240) -> str:
+    """The sentence around a character offset, trimmed to limit characters"""
+    start = 0
+    for m in _SENTENCE_END_RE.finditer(text):
+        if m.end() > offset:
+            sentence = text[start:m.start()]
+            break
+        start = m.end()
+    else:
+        sentence = text[start:]
+    sentence = re.sub(r'[*#_`]+', '', ' '.join(sentence.split()))
+    return sentence if len(sentence) <= limit else sentence[:limit - 1].rstrip() + '…'
+
+
+def format_year(year: int) -> str:
+    return f'{-year} BCE' if year < 0 else f'{year} CE'
+
+
+class DateIndex:
+    """
+    Events (date span + sentence) linked to chunk ids, sorted by start year.
+
+    save() appends the events of changed chunks to a log next to the JSON
+    file (see delta_log.py) and rewrites the file itself only once the log
+    has grown past compact_ratio of it.
+    """
+
+    # Batches at least this large are merged in one pass instead of inserted one by one
+    _MERGE_AT = 64
+
+    def __init__(self, path: str = None, compact_ratio: float = 0.5):
+        """
+        Args:
+            path: JSON file to load from and save() to
+            compact_ratio: Log size, relative to the JSON file, that triggers a rewrite
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._events: List[Dict] = []
+        self._keys: List[Tuple[int, int]] = []  # (start, end) per event, the sort key
+        self._by_chunk: Dict[str, List[Dict]] = {}
+        self._max_span = 0
+        self.version = 0
+        self._changed = set()  # chunk ids to log on the next save()
+        self._log = DeltaLog(f'{path}.log', compact_ratio) if path else None
+        if path and os.path.exists(path):
+            self._load(path)
+        if self._log:
+            self._apply(latest(self._log.read(initial=True)))
+            self._changed.clear()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> int:
+        """
+        Extract and index the dates of chunks (re-adding an id replaces its events).
+
+        Returns:
+            Number of events added
+        """
+        new = []
+        for chunk_id, text in zip(ids, texts):
+            for mention in extract_dates(text):
+                new.append({**asdict(mention), 'chunk_id': chunk_id, 'event': sentence_at(text, mention.offset)})
+        with self._lock:
+            self.remove(ids)
+            if new:
+                self._insert(new)
+        return len(new)
+
+    def _insert(self, new: List[Dict]) -> None:
+        new.sort(key=_event_key)
+        if len(new) < self._MERGE_AT:
+            for event in new:
+                key = _event_key(event)
+                i = bisect_right(self._keys, key)
+                self._keys.insert(i, key)
+                self._events.insert(i, event)
+        else:
+            merged = list(heapq.merge(zip(self._keys, self._events), ((_event_key(e), e) for e in new), key=lambda pair: pair[0]))
+            self._keys = [k for k, _ in merged]
+            self._events = [e for _, e in merged]
+        for event in new:
+            self._by_chunk.setdefault(event['chunk_id'], []).append(event)
+            self._max_span = max(self._max_span, event['end'] - event['start'])
+        self._touch(e['chunk_id'] for e in new)
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            gone = [chunk_id for chunk_id in set(ids) if chunk_id in self._by_chunk]
+            doomed = [e for chunk_id in gone for e in self._by_chunk.pop(chunk_id)]
+            if not doomed:
+                return
+            if len(doomed) >= self._MERGE_AT:
+                doomed_ids = {id(e) for e in doomed}
+                kept = [(k, e) for k, e in zip(self._keys, self._events) if id(e) not in doomed_ids]
+                self._keys = [k for k, _ in kept]
+                self._events = [e for _, e in kept]
+            else:
+                for event in doomed:
+                    key = _event_key(event)
+                    i = bisect_left(self._keys, key)
+                    while self._events[i] is not event:
+                        i += 1
+                    del self._keys[i]
+                    del self._events[i]
+            # _max_span is left as is: an upper bound still makes range() correct
+            self._touch(gone)
+
+    def _touch(self, ids: Iterable[str]) -> None:
+        self.version += 1
+        self._changed.update(ids)
+
+    def range(self, start: Optional[int] = None, end: Optional[int] = None) -> List[Dict]:
+        """Events whose span overlaps [start, end] (open-ended when None), by start year"""
+        with self._lock:
+            lo = 0 if start is None else bisect_left(self._keys, (start - self._max_span,))
+            hi = len(self._keys) if end is None else bisect_right(self._keys, (end, math.inf))
+            return [e for e in self._events[lo:hi] if start is None or e['end'] >= start]
+
+    def save(self, path: str = None, compact: Optional[bool] = None) -> None:
+        """
+        Persist changes since the last save.
+
+        Args:
+            path: Write a full copy here instead (e.g. for a backup)
+            compact: Force (True) or suppress (False) rewriting the JSON file;
+                None rewrites once the log is large
+        """
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            if path != self.path:
+                self._write(path)
+                return
+            if not self._changed and not compact and self._log.exists():
+                return
+            records = [{'key': chunk_id, 'value': self._by_chunk.get(chunk_id)} for chunk_id in self._changed]
+            self._log.save(records, lambda: self._write(path), file_bytes(path), compact)
+            self._changed.clear()
+
+    def refresh(self) -> bool:
+        """
+        Apply changes other processes saved since this index was loaded.
+
+        Returns:
+            False when the index has to be reloaded instead (file rewritten)
+        """
+        if not self._log:
+            return True
+        with self._lock:
+            records = self._log.read()
+            if records is None:
+                return False
+            pending, self._changed = self._changed, set()
+            self._apply(latest(records))
+            self._changed = pending
+            return True
+
+    def _apply(self, changes: Dict[str, Optional[List[Dict]]]) -> None:
+        self.remove(changes)
+        new = [event for events in changes.values() if events for event in events]
+        if new:
+            self._insert(new)
+
+    def _write(self, path: str) -> None:
+        """Write the whole index as JSON (atomic replace)"""
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'events': self._events}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def _load(self, path: str) -> None:
+        with open(path, encoding='utf-8') as f:
+            self._events = sorted(json.load(f)['events'], key=_event_key)
+        self._keys = [_event_key(e) for e in self._events]
+        for event in self._events:
+            self._by_chunk.setdefault(event['chunk_id'], []).append(event)
+        self._max_span = max((e['end'] - e['start'] for e in self._events), default=0)
+        self.version += 1
+        logger.info(f"Loaded date index with {len(self._events)} events")
+
+
+def _event_key(event: Dict) -> Tuple[int, int]:
+    return event['start'], event['end']
+
+
+class TimelineGenerator:
+    """
+    Generates chronological timelines from the precomputed date index.
+    """
+
+    def __init__(self, date_index: DateIndex, relevance: Callable[[str], Dict[str, float]], cache_size: int = 256):
+        """
+        Args:
+            date_index: Index built at ingest
+            relevance: topic -> {chunk id: score} for chunks about the topic (e.g. BM25)
+            cache_size: Timelines cached per (topic, range) until the index changes
+        """
+        self.date_index = date_index
+        self.relevance = relevance
+        self.cache = LRUCache(cache_size)
+        logger.info("✅ Timeline Generator initialized")
+
+    def generate(self, topic: str, start: Optional[int] = None, end: Optional[int] = None, limit: int = 50) -> List[Dict]:
+        """
+        Generate a timeline for a topic.
+
+        Args:
+            topic: Timeline topic (e.g., "Indus Valley"); empty for every dated event
+            start: Earliest year (signed, BCE negative)
+            end: Latest year
+            limit: Most relevant events to return
+
+        Returns:
+            List of timeline events sorted by date
+        """
+        key = (normalize_question(topic), start, end, limit, self.date_index.version)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        events = self.date_index.range(start, end)
+        if topic.strip():
+            scores = self.relevance(topic)
+            events = [dict(e, score=scores[e['chunk_id']]) for e in events if e['chunk_id'] in scores]
+            # Most relevant first when trimming, then back into date order
+            events = sorted(events, key=lambda e: -e['score'])
+        timeline, seen = [], set()
+        for e in events:
+            # Overlapping chunks repeat the same mention: one event per span per document
+            marker = (e['start'], e['end'], e['chunk_id'].rsplit('_', 1)[0])
+            if marker in seen:
+                continue
+            seen.add(marker)
+            timeline.append({
+                'date': e['label'],
+                'start': e['start'],
+                'end': e['end'],
+                'period': format_year(e['start']) if e['start'] == e['end'] else f"{format_year(e['start'])} – {format_year(e['end'])}",
+                'event': e['event'],
+                'approximate': e['approximate'],
+                'source': e['chunk_id'],
+                'score': round(e.get('score', 0.0), 3),
+            })
+            if len(timeline) >= limit:
+                break
+        timeline.sort(key=lambda e: (e['start'], e['end']))
+        self.cache.put(key, timeline)
+        return timeline